@@ -13,12 +13,16 @@ import logging
 import os
 import time
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any, Callable, Coroutine, Dict, List, Optional
 
 from agno.scheduler.cron import compute_next_run, validate_cron_expr
 
 logger = logging.getLogger("jada.scheduler")
 
+# La validación de agno (croniter) se repite con las mismas pocas expresiones: se cachea
+_is_valid_cron = lru_cache(maxsize=256)(validate_cron_expr)
+
 # Archivo de persistencia de cronjobs (reutiliza el del branch cronjobs-gui)
 STORAGE_FILE = os.getenv("CRONJOBS_FILE", "cronjobs.json")
 
@@ -107,7 +111,7 @@ class JadaScheduler:
             timezone_str: Timezone (default: UTC)
             workflow_id: ID del workflow determinista (reemplaza al prompt)
         """
-        if not validate_cron_expr(cron_expr):
+        if not _is_valid_cron(cron_expr):
             raise ValueError(f"Expresión cron inválida: '{cron_expr}'")
 
         # ── Deduplicación: evitar cronjobs idénticos ──────────────────────────
@@ -150,7 +154,7 @@ class JadaScheduler:
         job = self._jobs[job_id]
         # Si cambia la expresión, recalcular next_run
         if "cron_expr" in kwargs:
-            if not validate_cron_expr(kwargs["cron_expr"]):
+            if not _is_valid_cron(kwargs["cron_expr"]):
                 raise ValueError(f"Expresión cron inválida: '{kwargs['cron_expr']}'")
             kwargs["next_run_at"] = compute_next_run(kwargs["cron_expr"], job.get("timezone", "UTC"))
         job.update(kwargs)
@@ -21,7 +21,7 @@ from tools.notes import NotesDB
 from tools.gym_parser import parse_workout_text
 from tools.email_reader import list_emails, read_email, search_emails
 from tools.email_sender import send_email
-from tools.calendar_api import get_today_events, get_upcoming_events, add_event
+from tools.calendar_api import get_today_events, get_upcoming_events, add_event, add_events
 from tools.summarizer import fetch_and_summarize
 from tools.reminders import reminder_manager
 from tools.deep_think import deep_think
@@ -32,6 +32,17 @@ from tools.supabase_storage import upload_file, list_files, download_file, delet
 from tools.pdf_reader import read_pdf, render_pdf_pages
 from tools.reddit import reddit_trending, reddit_subreddit, reddit_search
 
+# orjson (opcional) serializa los resultados de todas las tools bastante más rápido que json
+try:
+    import orjson
+
+    def _to_json(obj) -> str:
+        # OPT_NON_STR_KEYS: claves int/float se convierten a str, igual que json.dumps
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    def _to_json(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
 
 class JadaTools(Toolkit):
     """
@@ -43,7 +54,7 @@ class JadaTools(Toolkit):
     GROUPS = {
         "notes": ["note_save", "note_list", "note_search", "note_delete"],
         "email": ["email_list", "email_read", "email_search", "email_send"],
-        "calendar": ["calendar_today", "calendar_upcoming", "calendar_add_event"],
+        "calendar": ["calendar_today", "calendar_upcoming", "calendar_add_event", "calendar_add_events"],
         "gym": ["gym_save_workout", "gym_start_session", "gym_add_exercise",
                 "gym_end_session", "gym_get_recent", "gym_exercise_history",
                 "gym_save_routine", "gym_get_routines", "gym_get_stats"],
@@ -135,7 +146,7 @@ class JadaTools(Toolkit):
                 if isinstance(data[k], str) and len(data[k]) > 2000:
                     data[k] = data[k][:2000] + "\n... [truncado]"
 
-        compressed = json.dumps(data, ensure_ascii=False)
+        compressed = _to_json(data)
         if len(compressed) > max_chars:
             return compressed[:max_chars] + "..."
         return compressed
@@ -177,22 +188,21 @@ class JadaTools(Toolkit):
             command: Comando a ejecutar
             timeout: Timeout en segundos (default: 30)
         """
-        import json
         res = await run_command(command, timeout, self.user_id or "unknown")
-        return json.dumps(res, ensure_ascii=False)
+        return _to_json(res)
 
     # ── Archivos ───────────────────────────────────────────────────────────────
     async def read_file(self, path: str) -> str:
         """Lee el contenido de un archivo del sistema."""
-        import json; return json.dumps(await read_file(path), ensure_ascii=False)
+        return _to_json(await read_file(path))
 
     async def write_file(self, path: str, content: str, append: bool = False) -> str:
         """Crea o sobreescribe un archivo. Puede añadir al final si append=True."""
-        import json; return json.dumps(await write_file(path, content, append), ensure_ascii=False)
+        return _to_json(await write_file(path, content, append))
 
     async def list_dir(self, path: str = ".") -> str:
         """Lista el contenido (archivos y carpetas) de un directorio."""
-        import json; return json.dumps(await list_dir(path), ensure_ascii=False)
+        return _to_json(await list_dir(path))
 
     # ── Web ────────────────────────────────────────────────────────────────────
     async def web_search(self, query: str, max_results: int = 5, search_type: str = "text") -> str:
@@ -204,47 +214,45 @@ class JadaTools(Toolkit):
             max_results: Número máximo de resultados
             search_type: Tipo de búsqueda: 'text' o 'news'
         """
-        import json
-        raw = json.dumps(await search(query, max_results, search_type), ensure_ascii=False)
+        raw = _to_json(await search(query, max_results, search_type))
         return self._compress_output("web_search", raw)
 
     def get_weather(self, location: str = "Medellin") -> str:
         """
         Obtiene el clima actual, temperatura y posibilidad de lluvia de una ciudad.
         """
-        import json; return json.dumps(get_weather(location), ensure_ascii=False)
+        return _to_json(get_weather(location))
 
     # ── Browser ────────────────────────────────────────────────────────────────
     async def browser_navigate(self, url: str) -> str:
         """Navega a una URL en el browser. Úsalo para abrir páginas web."""
         browser = await BrowserTool.get_instance()
-        import json; return json.dumps(await browser.navigate(url), ensure_ascii=False)
+        return _to_json(await browser.navigate(url, key=self.room_id))
 
     async def browser_get_text(self) -> str:
         """Extrae el texto visible de la página actualmente abierta en el browser."""
         browser = await BrowserTool.get_instance()
-        import json
-        raw = json.dumps(await browser.get_page_text(), ensure_ascii=False)
+        raw = _to_json(await browser.get_page_text(key=self.room_id))
         return self._compress_output("browser_get_text", raw, max_chars=2000)
 
     async def browser_click(self, selector: str) -> str:
         """Hace click en un elemento de la página usando un selector CSS o texto visible."""
         browser = await BrowserTool.get_instance()
-        import json; return json.dumps(await browser.click(selector), ensure_ascii=False)
+        return _to_json(await browser.click(selector, key=self.room_id))
 
     async def browser_fill(self, selector: str, text: str) -> str:
         """Rellena un campo de formulario en la página actual."""
         browser = await BrowserTool.get_instance()
-        import json; return json.dumps(await browser.fill(selector, text), ensure_ascii=False)
+        return _to_json(await browser.fill(selector, text, key=self.room_id))
 
     # ── Samsung TV (SmartThings) ───────────────────────────────────────────────
     def samsung_list_devices(self) -> str:
         """Lista todos los dispositivos disponibles en SmartThings (incluye TVs)."""
-        import json; return json.dumps(list_devices(), ensure_ascii=False)
+        return _to_json(list_devices())
 
     def samsung_tv_status(self, device_id: Optional[str] = None) -> str:
         """Obtiene el estado actual del TV (encendido/apagado)."""
-        import json; return json.dumps(tv_status(device_id), ensure_ascii=False)
+        return _to_json(tv_status(device_id))
 
     def samsung_tv_control(self, command: str, device_id: Optional[str] = None) -> str:
         """
@@ -254,7 +262,7 @@ class JadaTools(Toolkit):
             command: Comando: 'on', 'off', 'up', 'down', 'mute', 'unmute', 'ok', 'back', 'home', 'menu', 'source', 'hdmi1', 'hdmi2', 'hdmi3'
             device_id: ID del dispositivo TV (Opcional)
         """
-        import json; return json.dumps(tv_control(action=command, device_name=device_id), ensure_ascii=False)
+        return _to_json(tv_control(action=command, device_name=device_id))
 
     # ── Gym ────────────────────────────────────────────────────────────────────
     async def gym_save_workout(
@@ -279,7 +287,6 @@ class JadaTools(Toolkit):
             grupos_musculares: Grupos trabajados: ['pecho', 'hombros', 'triceps']
             notas: Notas generales del entrenamiento
         """
-        import json
         raw_text = ejercicios_raw
         parsed_exercises = parse_workout_text(raw_text) if raw_text else (ejercicios or [])
         res = await self.gym_db.save_workout(
@@ -288,7 +295,7 @@ class JadaTools(Toolkit):
             grupos_musculares=grupos_musculares,
             notes=notas,
         )
-        return json.dumps(res, ensure_ascii=False)
+        return _to_json(res)
 
     async def gym_start_session(
         self, 
@@ -308,20 +315,19 @@ class JadaTools(Toolkit):
             tipo: push, pull, pierna, fullbody, cardio, etc.
             grupos_musculares: Grupos trabajados
         """
-        import json
         if self._gym_session:
-            return json.dumps({"error": "Ya hay una sesión activa. Usa gym_end_session primero."}, ensure_ascii=False)
+            return _to_json({"error": "Ya hay una sesión activa. Usa gym_end_session primero."})
         self._gym_session = {
             "nombre": nombre, "fecha": fecha,
             "tipo": tipo,
             "grupos_musculares": grupos_musculares or [],
             "ejercicios": [],
         }
-        return json.dumps({
+        return _to_json({
             "success": True,
             "message": f"Sesión iniciada: {nombre}",
             "tip": "Manda ejercicios uno por uno. Di 'listo' para guardar.",
-        }, ensure_ascii=False)
+        })
 
     async def gym_add_exercise(self, ejercicio_raw: str) -> str:
         """
@@ -330,19 +336,18 @@ class JadaTools(Toolkit):
         Args:
             ejercicio_raw: Texto EXACTO del usuario con el/los ejercicio(s), tal cual.
         """
-        import json
         if not self._gym_session:
-            return json.dumps({"error": "No hay sesión de gym activa. Usa gym_start_session primero."}, ensure_ascii=False)
+            return _to_json({"error": "No hay sesión de gym activa. Usa gym_start_session primero."})
         parsed = parse_workout_text(ejercicio_raw)
         if not parsed:
-            return json.dumps({"error": f"No pude parsear: '{ejercicio_raw}'. Revisa el formato."}, ensure_ascii=False)
+            return _to_json({"error": f"No pude parsear: '{ejercicio_raw}'. Revisa el formato."})
         self._gym_session["ejercicios"].extend(parsed)
-        return json.dumps({
+        return _to_json({
             "success": True,
             "added": [e["nombre"] for e in parsed],
             "added_count": len(parsed),
             "total_exercises": len(self._gym_session["ejercicios"]),
-        }, ensure_ascii=False)
+        })
 
     async def gym_end_session(self, notas: str = "") -> str:
         """
@@ -351,13 +356,12 @@ class JadaTools(Toolkit):
         Args:
             notas: Notas adicionales del entrenamiento
         """
-        import json
         if not self._gym_session:
-            return json.dumps({"error": "No hay sesión de gym activa."}, ensure_ascii=False)
+            return _to_json({"error": "No hay sesión de gym activa."})
         session = self._gym_session
         self._gym_session = None
         if not session["ejercicios"]:
-            return json.dumps({"error": "La sesión no tiene ejercicios. No se guardó nada."}, ensure_ascii=False)
+            return _to_json({"error": "La sesión no tiene ejercicios. No se guardó nada."})
         result = await self.gym_db.save_workout(
             name=session["nombre"], date_str=session["fecha"],
             exercises=session["ejercicios"], tipo=session["tipo"],
@@ -366,11 +370,11 @@ class JadaTools(Toolkit):
         )
         result["total_exercises"] = len(session["ejercicios"])
         result["total_series"] = sum(e["series"] for e in session["ejercicios"])
-        return json.dumps(result, ensure_ascii=False)
+        return _to_json(result)
 
     async def gym_get_recent(self, limit: int = 10) -> str:
         """Obtiene los últimos entrenamientos registrados en la base de datos de gym."""
-        import json; return json.dumps(await self.gym_db.get_recent_workouts(limit), ensure_ascii=False)
+        return _to_json(await self.gym_db.get_recent_workouts(limit))
 
     async def gym_exercise_history(self, exercise_name: str, limit: int = 10) -> str:
         """
@@ -379,64 +383,63 @@ class JadaTools(Toolkit):
         Args:
             exercise_name: Nombre del ejercicio (ej: 'Sentadilla', 'Press banca')
         """
-        import json; return json.dumps(await self.gym_db.get_exercise_history(exercise_name, limit), ensure_ascii=False)
+        return _to_json(await self.gym_db.get_exercise_history(exercise_name, limit))
 
     async def gym_save_routine(self, name: str, exercises: List[dict], description: str = "") -> str:
         """Guarda una rutina de entrenamiento generada para usarla después."""
-        import json; return json.dumps(await self.gym_db.save_routine(name, description, exercises), ensure_ascii=False)
+        return _to_json(await self.gym_db.save_routine(name, description, exercises))
 
     async def gym_get_routines(self) -> str:
         """Obtiene todas las rutinas guardadas en la base de datos."""
-        import json; return json.dumps(await self.gym_db.get_routines(), ensure_ascii=False)
+        return _to_json(await self.gym_db.get_routines())
 
     async def gym_get_stats(self) -> str:
         """Obtiene estadísticas de gym: total entrenamientos, ejercicios más frecuentes, etc."""
-        import json; return json.dumps(await self.gym_db.get_stats(), ensure_ascii=False)
+        return _to_json(await self.gym_db.get_stats())
 
     # ── Notas ──────────────────────────────────────────────────────────────────
     async def note_save(self, title: str, content: str, tags: str = "") -> str:
         """Guarda una nota personal del usuario. Puede tener título, contenido (markdown) y tags (separados por coma)."""
-        import json; return json.dumps(await self.notes_db.save_note(self.user_id, title, content, tags), ensure_ascii=False)
+        return _to_json(await self.notes_db.save_note(self.user_id, title, content, tags))
 
     async def note_list(self, limit: int = 20) -> str:
         """Lista las notas del usuario ordenadas por fecha de actualización."""
-        import json; return json.dumps(await self.notes_db.get_notes(self.user_id, limit), ensure_ascii=False)
+        return _to_json(await self.notes_db.get_notes(self.user_id, limit))
 
     async def note_search(self, query: str) -> str:
         """Busca notas por título, contenido o tags."""
-        import json; return json.dumps(await self.notes_db.search_notes(self.user_id, query), ensure_ascii=False)
+        return _to_json(await self.notes_db.search_notes(self.user_id, query))
 
     async def note_delete(self, note_id: str) -> str:
         """Elimina una nota por su ID."""
-        import json; return json.dumps(await self.notes_db.delete_note(self.user_id, note_id), ensure_ascii=False)
+        return _to_json(await self.notes_db.delete_note(self.user_id, note_id))
 
     # ── Email ──────────────────────────────────────────────────────────────────
     async def email_list(self, folder: str = "INBOX", limit: int = 10, unread_only: bool = False) -> str:
         """Lista los últimos correos electrónicos del usuario (solo lectura). Muestra remitente, asunto y fecha. Usa unread_only=True para ver solo los no leídos."""
-        import json
-        raw = json.dumps(await list_emails(folder, limit, unread_only), ensure_ascii=False)
+        raw = _to_json(await list_emails(folder, limit, unread_only))
         return self._compress_output("email_list", raw)
 
     async def email_read(self, email_id: str, folder: str = "INBOX") -> str:
         """Lee el contenido completo de un correo electrónico por su ID numérico."""
-        import json; return json.dumps(await read_email(email_id, folder), ensure_ascii=False)
+        return _to_json(await read_email(email_id, folder))
 
     async def email_search(self, query: str, folder: str = "INBOX", limit: int = 10) -> str:
         """Busca correos electrónicos por asunto o remitente."""
-        import json; return json.dumps(await search_emails(query, folder, limit), ensure_ascii=False)
+        return _to_json(await search_emails(query, folder, limit))
 
     async def email_send(self, to: str, subject: str, body: str) -> str:
         """Envía un correo electrónico a cualquier dirección."""
-        import json; return json.dumps(await send_email(to, subject, body), ensure_ascii=False)
+        return _to_json(await send_email(to, subject, body))
 
     # ── Calendario ─────────────────────────────────────────────────────────────
     async def calendar_today(self) -> str:
         """Obtiene los eventos del calendario de hoy."""
-        import json; return json.dumps(await get_today_events(), ensure_ascii=False)
+        return _to_json(await get_today_events())
 
     async def calendar_upcoming(self, days: int = 7, limit: int = 15) -> str:
         """Obtiene los próximos eventos del calendario en los siguientes N días."""
-        import json; return json.dumps(await get_upcoming_events(days, limit), ensure_ascii=False)
+        return _to_json(await get_upcoming_events(days, limit))
 
     async def calendar_add_event(self, title: str, start_datetime: str, end_datetime: str, description: str = "") -> str:
         """
@@ -447,17 +450,26 @@ class JadaTools(Toolkit):
             start_datetime: Fecha y hora de inicio (Formato ISO 8601, ej: '2026-02-28T14:00:00')
             end_datetime: Fecha y hora de fin (Formato ISO 8601, ej: '2026-02-28T15:00:00')
         """
-        import json; return json.dumps(await add_event(title, start_datetime, end_datetime, description), ensure_ascii=False)
+        return _to_json(await add_event(title, start_datetime, end_datetime, description))
+
+    async def calendar_add_events(self, events: list[dict]) -> str:
+        """
+        Agenda VARIOS eventos de una sola vez en el calendario de Google (más rápido que llamar calendar_add_event por cada uno).
+
+        Args:
+            events: Lista de eventos, cada uno con 'title', 'start_datetime', 'end_datetime' (ISO 8601) y opcional 'description'
+        """
+        return _to_json(await add_events(events))
 
     # ── Summarizer ─────────────────────────────────────────────────────────────
     async def summarize_url(self, url: str) -> str:
         """Descarga el contenido de una URL (página web, artículo, blog) y extrae el texto. Úsalo para resumir URLs."""
-        import json; return json.dumps(await fetch_and_summarize(url), ensure_ascii=False)
+        return _to_json(await fetch_and_summarize(url))
 
     # ── Deep Think ─────────────────────────────────────────────────────────────
     async def deep_think(self, task: str, context: str = "") -> str:
         """Delega una tarea compleja a un modelo de razonamiento profundo. Para análisis detallado, debugging."""
-        import json; return json.dumps(await deep_think(task, context), ensure_ascii=False)
+        return _to_json(await deep_think(task, context))
 
     # ── Recordatorios ──────────────────────────────────────────────────────────
     async def set_reminder(self, message: str, delay_seconds: Optional[int] = None, time: Optional[str] = None) -> str:
@@ -469,7 +481,6 @@ class JadaTools(Toolkit):
             delay_seconds: Segundos de espera (opcional si usas 'time').
             time: Tiempo en texto (ej: '5 minutos', '1 hora', '30s').
         """
-        import json
         from tools.reminders import parse_time_expression
         
         seconds = delay_seconds
@@ -479,19 +490,19 @@ class JadaTools(Toolkit):
                 seconds = parsed
                 
         if seconds is None:
-            return json.dumps({"error": "Debes proporcionar 'delay_seconds' (int) o 'time' (str)."}, ensure_ascii=False)
+            return _to_json({"error": "Debes proporcionar 'delay_seconds' (int) o 'time' (str)."})
 
-        return json.dumps(await reminder_manager.add_reminder(
+        return _to_json(await reminder_manager.add_reminder(
             message, seconds, self.room_id or "unknown", self.user_id or "unknown"
-        ), ensure_ascii=False)
+        ))
 
     async def list_reminders(self) -> str:
         """Lista los recordatorios activos (pendientes)."""
-        import json; return json.dumps(await reminder_manager.list_reminders(self.room_id), ensure_ascii=False)
+        return _to_json(await reminder_manager.list_reminders(self.room_id))
 
     async def cancel_reminders(self) -> str:
         """Cancela todos los recordatorios activos."""
-        import json; return json.dumps(await reminder_manager.cancel_all(self.room_id), ensure_ascii=False)
+        return _to_json(await reminder_manager.cancel_all(self.room_id))
         
     # ── Cronjobs (tareas programadas del agente) ───────────────────────────────────
     def cronjob_create(self, name: str, cron_expr: str, prompt: str, description: str = "", timezone: Optional[str] = None) -> str:
@@ -506,13 +517,12 @@ class JadaTools(Toolkit):
         """
         from agent.scheduler import get_scheduler
         import time as _time
-        import json
         import os
         
         sched = get_scheduler()
         timezone = timezone or os.getenv("TIMEZONE", "UTC")
         if not sched:
-            return json.dumps({"error": "Scheduler no inicializado. Reinicia Jada."}, ensure_ascii=False)
+            return _to_json({"error": "Scheduler no inicializado. Reinicia Jada."})
             
         job_id = f"cron-{int(_time.time())}"
         job = sched.add_job(
@@ -525,48 +535,44 @@ class JadaTools(Toolkit):
             timezone_str=timezone,
         )
         if job.get("_duplicate"):
-            return json.dumps({
+            return _to_json({
                 "success": False,
                 "duplicate": True,
                 "existing_id": job["id"],
                 "message": f"⚠️ Ya existe una tarea igual: '{job['name']}' (ID: {job['id']}). No se creó un duplicado.",
-            }, ensure_ascii=False)
-        return json.dumps({"success": True, "job": job, "message": f"✅ Tarea '{name}' creada con ID {job['id']}"}, ensure_ascii=False)
+            })
+        return _to_json({"success": True, "job": job, "message": f"✅ Tarea '{name}' creada con ID {job['id']}"})
 
     def cronjob_list(self) -> str:
         """Lista todas las tareas programadas del agente. USA ESTO PRIMERO para obtener el job_id"""
         from agent.scheduler import get_scheduler
-        import json
         sched = get_scheduler()
         if not sched:
-            return json.dumps({"error": "Scheduler no inicializado."}, ensure_ascii=False)
-        return json.dumps({"jobs": sched.list_jobs(), "status": sched.get_status()}, ensure_ascii=False)
+            return _to_json({"error": "Scheduler no inicializado."})
+        return _to_json({"jobs": sched.list_jobs(), "status": sched.get_status()})
 
     async def delete_file(self, url_or_path: str) -> str:
         """Elimina un archivo de Supabase Storage mediante su URL o path en el bucket."""
-        import json
         is_success, error_msg = await delete_file(url_or_path, self.user_id)
         if not is_success:
-            return json.dumps({"error": error_msg}, ensure_ascii=False)
-        return json.dumps({"success": True, "message": "Archivo eliminado"}, ensure_ascii=False)
+            return _to_json({"error": error_msg})
+        return _to_json({"success": True, "message": "Archivo eliminado"})
 
     def cronjob_delete(self, job_id: str) -> str:
         """Elimina permanentemente una tarea programada dado su job_id."""
         from agent.scheduler import get_scheduler
-        import json
         sched = get_scheduler()
         if not sched:
-            return json.dumps({"error": "Scheduler no inicializado."}, ensure_ascii=False)
+            return _to_json({"error": "Scheduler no inicializado."})
         deleted = sched.delete_job(job_id)
-        return json.dumps({"success": deleted, "message": f"Tarea {'eliminada' if deleted else 'no encontrada'}"}, ensure_ascii=False)
+        return _to_json({"success": deleted, "message": f"Tarea {'eliminada' if deleted else 'no encontrada'}"})
 
     def cronjob_update(self, job_id: str, name: Optional[str] = None, cron_expr: Optional[str] = None, prompt: Optional[str] = None, enabled: Optional[bool] = None) -> str:
         """Actualiza una tarea programada dado su job_id."""
         from agent.scheduler import get_scheduler
-        import json
         sched = get_scheduler()
         if not sched:
-            return json.dumps({"error": "Scheduler no inicializado."}, ensure_ascii=False)
+            return _to_json({"error": "Scheduler no inicializado."})
             
         update_args = {}
         if name is not None: update_args["name"] = name
@@ -575,20 +581,19 @@ class JadaTools(Toolkit):
         if enabled is not None: update_args["enabled"] = enabled
         
         updated = sched.update_job(job_id, **update_args)
-        return json.dumps({"success": bool(updated), "job": updated}, ensure_ascii=False)
+        return _to_json({"success": bool(updated), "job": updated})
 
     def cronjob_run_now(self, job_id: str) -> str:
         """Ejecuta una tarea programada ahora mismo, sin esperar su próxima ejecución."""
         from agent.scheduler import get_scheduler
-        import json
         sched = get_scheduler()
         if not sched:
-            return json.dumps({"error": "Scheduler no inicializado."}, ensure_ascii=False)
+            return _to_json({"error": "Scheduler no inicializado."})
         job = sched.get_job(job_id)
         if not job:
-            return json.dumps({"error": f"Tarea '{job_id}' no encontrada"}, ensure_ascii=False)
+            return _to_json({"error": f"Tarea '{job_id}' no encontrada"})
         asyncio.create_task(sched._execute_job(job))
-        return json.dumps({"success": True, "message": f"⏰ Tarea '{job['name']}' ejecutándose ahora"}, ensure_ascii=False)
+        return _to_json({"success": True, "message": f"⏰ Tarea '{job['name']}' ejecutándose ahora"})
 
     async def generate_image(self, prompt: str, aspect_ratio: str = "1:1") -> str:
         """
@@ -600,15 +605,14 @@ class JadaTools(Toolkit):
             prompt: Descripción detallada de la imagen (en inglés o español).
             aspect_ratio: Relación de aspecto (default: "1:1"). Opciones: "16:9", "9:16", "21:9", "2:3", "3:2", "4:5", "5:4", "9:21".
         """
-        import json
         res = generate_image(prompt, aspect_ratio)
         if res["success"] and self.bot:
             try:
                 await self.bot.send_image(self.room_id, res["file_path"], f"🎨 {prompt[:80]}")
-                return json.dumps({"success": True, "message": "Imagen generada y enviada al chat."}, ensure_ascii=False)
+                return _to_json({"success": True, "message": "Imagen generada y enviada al chat."})
             except Exception as e:
-                return json.dumps({"success": True, "file_path": res["file_path"], "message": f"Imagen generada en {res['file_path']} pero error al enviar: {e}"}, ensure_ascii=False)
-        return json.dumps(res, ensure_ascii=False)
+                return _to_json({"success": True, "file_path": res["file_path"], "message": f"Imagen generada en {res['file_path']} pero error al enviar: {e}"})
+        return _to_json(res)
 
     async def send_file(self, file_path: str) -> str:
         """
@@ -630,14 +634,14 @@ class JadaTools(Toolkit):
                     if files:
                         file_path = os.path.join(img_dir, files[0])
                     else:
-                        return json.dumps({"error": "No hay imágenes generadas."}, ensure_ascii=False)
+                        return _to_json({"error": "No hay imágenes generadas."})
                 else:
-                    return json.dumps({"error": f"Archivo no encontrado: {file_path}"}, ensure_ascii=False)
+                    return _to_json({"error": f"Archivo no encontrado: {file_path}"})
             else:
-                return json.dumps({"error": f"Archivo no encontrado: {file_path}"}, ensure_ascii=False)
+                return _to_json({"error": f"Archivo no encontrado: {file_path}"})
         
         if not self.bot:
-            return json.dumps({"error": "No hay conexión al chat."}, ensure_ascii=False)
+            return _to_json({"error": "No hay conexión al chat."})
         
         try:
             ext = os.path.splitext(file_path)[1].lower()
@@ -645,9 +649,9 @@ class JadaTools(Toolkit):
                 await self.bot.send_image(self.room_id, file_path, os.path.basename(file_path))
             else:
                 await self.bot.send_file(self.room_id, file_path)
-            return json.dumps({"success": True, "message": f"✅ Archivo enviado: {os.path.basename(file_path)}"}, ensure_ascii=False)
+            return _to_json({"success": True, "message": f"✅ Archivo enviado: {os.path.basename(file_path)}"})
         except Exception as e:
-            return json.dumps({"error": f"Error enviando archivo: {str(e)}"}, ensure_ascii=False)
+            return _to_json({"error": f"Error enviando archivo: {str(e)}"})
 
     async def describe_image(self, file_path: str, question: str = "Describe esta imagen en detalle en español.") -> str:
         """
@@ -661,7 +665,7 @@ class JadaTools(Toolkit):
             file_path: Ruta absoluta de la imagen (ej: /opt/jada/tmp/images/gen_123.png, /tmp/jada_pdf_pages/planos_p1.png)
             question: Pregunta o instrucción sobre la imagen (default: describir en español).
         """
-        import json, os, base64, requests, asyncio
+        import os, base64, requests, asyncio
 
         # Auto-find latest image if path doesn't exist
         if not os.path.exists(file_path):
@@ -672,10 +676,10 @@ class JadaTools(Toolkit):
                     if files:
                         file_path = os.path.join(img_dir, files[0])
                     else:
-                        return json.dumps({"error": "No hay imágenes generadas."}, ensure_ascii=False)
+                        return _to_json({"error": "No hay imágenes generadas."})
 
         if not os.path.exists(file_path):
-            return json.dumps({"error": f"Archivo no encontrado: {file_path}"}, ensure_ascii=False)
+            return _to_json({"error": f"Archivo no encontrado: {file_path}"})
 
         def _call_vision():
             with open(file_path, "rb") as f:
@@ -706,13 +710,13 @@ class JadaTools(Toolkit):
 
         try:
             description = await asyncio.to_thread(_call_vision)
-            return json.dumps({
+            return _to_json({
                 "success": True,
                 "description": description,
                 "file": os.path.basename(file_path),
-            }, ensure_ascii=False)
+            })
         except Exception as e:
-            return json.dumps({"error": f"Error analizando imagen: {str(e)}"}, ensure_ascii=False)
+            return _to_json({"error": f"Error analizando imagen: {str(e)}"})
 
     # ── PDF ─────────────────────────────────────────────────────────────────
 
@@ -725,7 +729,6 @@ class JadaTools(Toolkit):
             file_path: Ruta local del PDF (ej: /opt/jada/tmp/planos.pdf, /tmp/jada_files/doc.pdf)
             max_pages: Máximo de páginas a leer (default: 30)
         """
-        import json
         result = await read_pdf(file_path, max_pages)
 
         # Si tiene texto, retornar directamente
@@ -733,7 +736,7 @@ class JadaTools(Toolkit):
             text = result.get("text", "")
             if len(text) > 3000:
                 result["text"] = text[:3000] + "\n... [truncado]"
-            return json.dumps(result, ensure_ascii=False)
+            return _to_json(result)
 
         # Si no tiene texto (PDF de imágenes), renderizar páginas como imágenes
         if result.get("success") and not result.get("has_text"):
@@ -746,7 +749,7 @@ class JadaTools(Toolkit):
                 logger.error(f"Error renderizando PDF: {e}")
                 result["render_error"] = str(e)
 
-        return json.dumps(result, ensure_ascii=False)
+        return _to_json(result)
 
     # ── Reddit ─────────────────────────────────────────────────────────────
 
@@ -756,9 +759,8 @@ class JadaTools(Toolkit):
         Args:
             limit: Número de posts a mostrar (default: 10, máx 25)
         """
-        import json
         posts = await reddit_trending(min(limit, 25))
-        return json.dumps(posts, ensure_ascii=False)
+        return _to_json(posts)
 
     async def reddit_subreddit(self, subreddit: str, sort: str = "hot",
                                limit: int = 10, time_filter: str = "day") -> str:
@@ -770,9 +772,8 @@ class JadaTools(Toolkit):
             limit: Número de posts (default: 10)
             time_filter: Para sort=top: hour, day, week, month, year, all
         """
-        import json
         posts = await reddit_subreddit(subreddit, sort, min(limit, 25), time_filter)
-        return json.dumps(posts, ensure_ascii=False)
+        return _to_json(posts)
 
     async def reddit_search(self, query: str, subreddit: str = "",
                             limit: int = 10, sort: str = "relevance") -> str:
@@ -784,9 +785,8 @@ class JadaTools(Toolkit):
             limit: Número de resultados (default: 10)
             sort: relevance, hot, top, new, comments
         """
-        import json
         posts = await reddit_search(query, subreddit, min(limit, 25), sort)
-        return json.dumps(posts, ensure_ascii=False)
+        return _to_json(posts)
 
     # ── Storage (Supabase) ─────────────────────────────────────────────────
 
@@ -800,7 +800,7 @@ class JadaTools(Toolkit):
             folder: Carpeta en el storage donde guardar (opcional).
         """
         result = await upload_file(file_path, remote_name or None, folder)
-        return json.dumps(result, ensure_ascii=False)
+        return _to_json(result)
 
     async def storage_list(self, folder: str = "", limit: int = 20) -> str:
         """Lista archivos almacenados en la nube.
@@ -810,7 +810,7 @@ class JadaTools(Toolkit):
             limit: Máximo de archivos a retornar.
         """
         result = await list_files(folder, limit)
-        return json.dumps(result, ensure_ascii=False)
+        return _to_json(result)
 
     async def storage_download(self, remote_path: str, dest_path: str = "") -> str:
         """Descarga un archivo de la nube al servidor.
@@ -820,7 +820,7 @@ class JadaTools(Toolkit):
             dest_path: Ruta local donde guardar (opcional, usa /opt/jada/tmp/).
         """
         result = await download_file(remote_path, dest_path or None)
-        return json.dumps(result, ensure_ascii=False)
+        return _to_json(result)
 
     async def storage_delete(self, remote_path: str) -> str:
         """Elimina un archivo del storage en la nube.
@@ -829,4 +829,4 @@ class JadaTools(Toolkit):
             remote_path: Ruta del archivo a eliminar (ej: 'docs/viejo.pdf').
         """
         result = await delete_file(remote_path)
-        return json.dumps(result, ensure_ascii=False)
+        return _to_json(result)
@@ -16,29 +16,50 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from agent.agent import Agent
+from agent.heartbeat import _parse_heartbeat_config
+from agent.scheduler import init_scheduler
 from matrix.client import MatrixBot
+from tools.reminders import reminder_manager
 from tools.api_server import start_api_server
+from tools.webhook_server import start_webhook
 
 VERSION = "0.5.2"
 PIDFILE = os.getenv("JADA_PIDFILE", "jada.pid")
 
 
+_LOCK_FD = None  # se mantiene abierto mientras viva el proceso (libera el lock al morir)
+
+
 def _acquire_lock() -> bool:
-    """Crea un PID lock para evitar dos instancias simultáneas. Retorna True si OK."""
-    if os.path.exists(PIDFILE):
-        try:
-            with open(PIDFILE) as f:
-                old_pid = int(f.read().strip())
-            # Verificar si el proceso anterior sigue vivo
-            import psutil
-            if psutil.pid_exists(old_pid):
-                return False  # otra instancia activa
-        except Exception:
-            pass  # PID file corrupto o psutil no instalado — continuar
-    # Escribir PID actual
-    with open(PIDFILE, "w") as f:
-        f.write(str(os.getpid()))
-    atexit.register(lambda: os.path.exists(PIDFILE) and os.unlink(PIDFILE))
+    """Toma un lock exclusivo sobre el PID file para evitar dos instancias. Retorna True si OK."""
+    global _LOCK_FD
+    fd = open(PIDFILE, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            fd.seek(0)
+            msvcrt.locking(fd.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fd.close()
+        return False  # otra instancia activa tiene el lock
+    # Escribir PID actual (informativo; el lock lo da el SO, no el contenido)
+    fd.seek(0)
+    fd.truncate()
+    fd.write(str(os.getpid()))
+    fd.flush()
+    _LOCK_FD = fd
+
+    def _release():
+        # Vaciar y cerrar (libera el lock), pero sin borrar: si se desvincula el archivo
+        # otra instancia podría bloquear un inodo nuevo en la misma ruta
+        fd.seek(0)
+        fd.truncate()
+        fd.close()
+
+    atexit.register(_release)
     return True
 
 
@@ -105,7 +126,15 @@ def print_banner(live_logs: bool = False) -> None:
   {DIM}Dashboard:{RESET} {GREEN}http://localhost:3000{RESET}
   {DIM}Modo:{RESET}     {mode_label}
 """
-    print(banner)
+    # Una sola escritura de bytes ya codificados; si la consola no lo soporta, print normal
+    data = (banner + "\n").encode("utf-8")
+    try:
+        sys.stdout.flush()
+        fd = sys.stdout.fileno()
+        while data:
+            data = data[os.write(fd, data):]
+    except (OSError, ValueError, AttributeError):
+        print(banner)
 
 
 async def main(live_logs: bool = False) -> None:
@@ -117,10 +146,6 @@ async def main(live_logs: bool = False) -> None:
     agent = bot.agent
     
     # Inicializar y arrancar scheduler
-    from agent.scheduler import init_scheduler
-    from agent.heartbeat import run_heartbeat, _parse_heartbeat_config
-    from tools.reminders import reminder_manager
-
     scheduler = init_scheduler(agent.run_scheduled)
     agent.set_send_callback(bot.send_message)
     reminder_manager.set_send_callback(bot.send_message)
@@ -147,7 +172,6 @@ async def main(live_logs: bool = False) -> None:
     start_api_server(scheduler_instance=scheduler)
 
     # Iniciar servidor Webhook local para n8n en background
-    from tools.webhook_server import start_webhook
     await start_webhook(bot, port=8899)
 
     await bot.start()
@@ -180,6 +204,13 @@ Modos:
     setup_logging(args.livelogs)
     print_banner(args.livelogs)
 
+    # Event loop más rápido si uvloop está disponible (no existe en Windows)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     try:
         asyncio.run(main(args.livelogs))
     except KeyboardInterrupt:
@@ -5,25 +5,31 @@ y los enrutá al agente Jada.
 
 Incluye: rate limiting, streaming de respuestas largas, cleanup de sesión.
 """
+from __future__ import annotations
+
 import asyncio
+import contextlib
 import os
 import time
 import logging
-from typing import Any, Optional
-from collections import defaultdict
+import mimetypes
+import random
+import re
+from typing import TYPE_CHECKING, Any, Optional
+from collections import OrderedDict, deque
 from dotenv import load_dotenv
-from nio import (
-    AsyncClient,
-    AsyncClientConfig,
-    LoginResponse,
-    RoomMessageText,
-    RoomMessageImage,
-    RoomMessageAudio,
-    RoomMessageFile,
-    InviteEvent,
-    MegolmEvent,
-    DownloadResponse,
-)
+from tools.reminders import reminder_manager
+
+if TYPE_CHECKING:
+    # nio se importa en diferido (MatrixBot.__init__/start) para no retrasar el banner
+    from nio import (
+        InviteEvent,
+        MegolmEvent,
+        RoomMessageAudio,
+        RoomMessageFile,
+        RoomMessageImage,
+        RoomMessageText,
+    )
 
 load_dotenv()
 
@@ -34,7 +40,8 @@ BOT_USER       = os.getenv("MATRIX_USER", "@jada:matrix.org")
 BOT_PASSWORD   = os.getenv("MATRIX_PASSWORD", "")
 ACCESS_TOKEN   = os.getenv("MATRIX_ACCESS_TOKEN", "")
 ROOM_IDS_RAW   = os.getenv("MATRIX_ROOM_IDS", "")
-ALLOWED_ROOMS  = set(r.strip() for r in ROOM_IDS_RAW.split(",") if r.strip())
+ALLOWED_ROOMS  = frozenset(r.strip() for r in ROOM_IDS_RAW.split(",") if r.strip())
+_ALLOW_ALL     = not ALLOWED_ROOMS  # sin rooms configurados → escuchar en todos
 AGENT_NAME     = os.getenv("AGENT_NAME", "Jada")
 GYM_ROOM_ALIAS = os.getenv("GYM_ROOM", "#gimnasio:matrix.juanmontoya.me")
 
@@ -44,34 +51,99 @@ INITIAL_RETRY_DELAY = 5
 
 # Rate limiting
 RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "15"))
+MAX_RATE_USERS = 10_000  # tope de buckets en memoria (LRU)
+
+# Máximo de llamadas simultáneas al agente (el resto espera su turno)
+MAX_CONCURRENCY = int(os.getenv("JADA_MAX_CONCURRENCY", "4"))
+
+# Timeouts configurables
+THINK_TIMEOUT   = int(os.getenv("JADA_THINK_TIMEOUT", "90"))   # seg máx para responder
+NUDGE_AFTER     = int(os.getenv("JADA_NUDGE_AFTER",   "25"))   # seg antes de avisar
+
+# Mensajes de progreso si tarda (humor negro incluído)
+NUDGE_MSGS = (
+    "_Todavía estoy aquí, sólo pensando muy fuerte..._",
+    "_Procesando. Mi GPU imaginaria está ardiendo._",
+    "_Sigo viva. Esto está tardando más de lo normal._",
+)
 
 # Streaming: mensajes más largos que esto se dividen en chunks
 MAX_MSG_LENGTH = int(os.getenv("MAX_MSG_LENGTH", "2000"))
 
+# Outbox: ventana para agrupar envíos salientes y tamaño máximo de cada lote
+OUTBOX_WINDOW = 0.02
+OUTBOX_MAX_BATCH = 32
+# Al apagar: segundos máximos esperando que se envíe lo que quedó en la outbox
+OUTBOX_DRAIN_TIMEOUT = 5.0
+
+# Claves fijas del contenido de m.room.message (se copian y completan en cada envío)
+_PLAIN_TEMPLATE = {"msgtype": "m.text"}
+_HTML_TEMPLATE = {"msgtype": "m.text", "format": "org.matrix.custom.html"}
+
+# Respaldo cuando mimetypes no reconoce la extensión (se arma una sola vez)
+_EXT_MIME = {
+    ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
+    ".gif": "image/gif", ".webp": "image/webp",
+    ".mp3": "audio/mpeg", ".ogg": "audio/ogg", ".wav": "audio/wav",
+    ".mp4": "video/mp4", ".pdf": "application/pdf",
+}
+
+# Marcas que convierte _markdown_to_html en una sola pasada: en cada posición se prueba
+# código, luego negrita, luego cursiva ('.' no cruza saltos de línea: ninguna marca
+# abarca dos líneas). La cursiva salta los **…** internos para no cerrarse en su primer '*'
+_MD_INLINE = re.compile(r"`([^`\n]+)`|\*\*(.+?)\*\*|\*((?:\*\*.+?\*\*|[^*\n])+?)\*(?!\*)")
+# Cercas de código (```json / ```) alrededor del JSON que devuelve el LLM
+_CODE_FENCE = re.compile(r"```(?:json)?\s*")
+
 
 class MatrixBot:
     def __init__(self, agent_class):
+        from nio import AsyncClient, AsyncClientConfig
+
         self.agent = agent_class(bot=self)
         self.client = AsyncClient(
             HOMESERVER,
             BOT_USER,
-            config=AsyncClientConfig(max_limit_exceeded=0, max_timeouts=0, store_sync_tokens=False),
+            config=AsyncClientConfig(max_limit_exceeded=3, max_timeouts=0, store_sync_tokens=False),
         )
         self._start_token = None
         self._start_time = time.time()
-        # Rate limiting: {user_id: [timestamp, ...]}
-        self._user_timestamps = defaultdict(list)
+        # Corte en ms para ignorar mensajes viejos (se fija de nuevo tras el sync inicial)
+        self._start_ms = int(self._start_time * 1000) - 60_000
+        # Rate limiting (token bucket): {user_id: (tokens disponibles, último refill en ns)}, en orden LRU
+        self._user_buckets: OrderedDict[str, tuple[float, int]] = OrderedDict()
         # Deduplicación: event_ids ya procesados (evita doble respuesta si hay 2 instancias)
+        # set para consultar en O(1) + deque con el orden de llegada para expulsar el más viejo
         self._processed_events: set[str] = set()
+        self._processed_order: deque[str] = deque()
         self._MAX_PROCESSED = 500  # evitar memory leak en sesiones largas
         # Flag: True cuando el bot ya terminó el sync inicial y está listo
         self._ready = False
         # Gym room: buffer de ejercicios
         self._gym_room_id: Optional[str] = None
         self._gym_buffer: list[str] = []
+        # Outbox: cola de envíos salientes consumida por un único writer (se crea en start())
+        self._outbox: Optional[asyncio.Queue] = None
+        self._outbox_task: Optional[asyncio.Task] = None
+        # Limita las llamadas concurrentes al LLM para no saturar la API en ráfagas
+        self._agent_sem = asyncio.Semaphore(MAX_CONCURRENCY)
+        # Sesión HTTP compartida (keep-alive) para llamadas auxiliares; se crea al primer uso
+        self._http = None
+        # Tareas "fire-and-forget" (typing off); se esperan en _cleanup
+        self._bg_tasks: set[asyncio.Task] = set()
 
     async def start(self):
         """Conectar al servidor Matrix e iniciar el loop de eventos con retry."""
+        from nio import (
+            InviteEvent,
+            LoginResponse,
+            MegolmEvent,
+            RoomMessageAudio,
+            RoomMessageFile,
+            RoomMessageImage,
+            RoomMessageText,
+        )
+
         logger.info(f"🤖 Conectando como {BOT_USER} a {HOMESERVER}...")
 
         if ACCESS_TOKEN:
@@ -95,18 +167,17 @@ class MatrixBot:
         self.client.add_event_callback(self._on_invite, InviteEvent)
         self.client.add_event_callback(self._on_megolm, MegolmEvent)
         
-        # Log joined rooms
-        rooms = self.client.rooms
-        logger.info(f"🏘️ Rooms unidos: {list(rooms.keys())}") if rooms else logger.info("🏘️ No estoy en ningún room.")
-
         # Conectar el sistema de recordatorios al chat
-        from tools.reminders import reminder_manager
         reminder_manager.set_send_callback(self._send)
         reminder_manager.set_voice_callback(self.send_voice)
 
         # Sync inicial — recolecta estado sin procesar mensajes
         await self.client.sync(timeout=0)
         self._start_token = self.client.next_batch
+        self._start_ms = int(time.time() * 1000) - 60_000  # 1 minuto de gracia
+        # Writer único para mensajes y reacciones salientes
+        self._outbox = asyncio.Queue()
+        self._outbox_task = asyncio.create_task(self._outbox_worker())
         # Ahora sí estamos listos para procesar mensajes NUEVOS
         self._ready = True
         
@@ -137,27 +208,69 @@ class MatrixBot:
 
     async def _cleanup(self):
         """Cerrar la sesión de Matrix limpiamente."""
+        if self._outbox_task:
+            # Enviar las respuestas ya encoladas antes de cortar el writer (con tope de tiempo)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._outbox.join(), OUTBOX_DRAIN_TIMEOUT)
+            self._outbox_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._outbox_task
+            self._outbox_task = None
+            self._outbox = None
+        if self._bg_tasks:
+            await asyncio.gather(*self._bg_tasks, return_exceptions=True)
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
         try:
             await self.client.close()
             logger.info("🔒 Sesión de Matrix cerrada limpiamente")
         except Exception as e:
             logger.debug(f"Error cerrando sesión: {e}")
 
-    def _check_rate_limit(self, user_id: str) -> bool:
-        """Verificar si el usuario excede el rate limit. Retorna True si está permitido."""
-        now = time.time()
-        window = 60.0  # 1 minuto
+    def _get_http(self):
+        """Retorna la sesión aiohttp compartida, creándola al primer uso (dentro del loop)."""
+        if self._http is None or self._http.closed:
+            import aiohttp
 
-        # Limpiar timestamps viejos
-        self._user_timestamps[user_id] = [
-            ts for ts in self._user_timestamps[user_id]
-            if now - ts < window
-        ]
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=16, ttl_dns_cache=300),
+            )
+        return self._http
 
-        if len(self._user_timestamps[user_id]) >= RATE_LIMIT_PER_MINUTE:
+    def _check_rate_limit(self, user_id: str) -> bool:
+        """Verificar si el usuario excede el rate limit. Retorna True si está permitido."""
+        return self._check_rate_limit_bulk(user_id, 1) == 1
+
+    def _check_rate_limit_bulk(self, user_id: str, n: int, now: Optional[int] = None) -> int:
+        """Consume hasta n mensajes del bucket del usuario en una sola pasada. Retorna cuántos se permiten."""
+        if now is None:
+            now = time.monotonic_ns()  # entero, inmune a ajustes del reloj de pared
+        rate = RATE_LIMIT_PER_MINUTE / 60e9  # tokens por nanosegundo
+
+        # Bucket lleno = RATE_LIMIT_PER_MINUTE mensajes seguidos; se recarga de forma continua
+        tokens, last = self._user_buckets.get(user_id, (RATE_LIMIT_PER_MINUTE, now))
+        tokens = min(RATE_LIMIT_PER_MINUTE, tokens + (now - last) * rate)
+        allowed = min(n, int(tokens))
+        if allowed < 1:
+            return 0
+
+        buckets = self._user_buckets
+        buckets[user_id] = (tokens - allowed, now)
+        buckets.move_to_end(user_id)
+        if len(buckets) > MAX_RATE_USERS:
+            buckets.popitem(last=False)  # el usuario visto hace más tiempo
+        return allowed
+
+    def _mark_processed(self, event_id: str) -> bool:
+        """Registra el evento como procesado. Retorna False si ya se había visto (duplicado)."""
+        if event_id in self._processed_events:
             return False
-
-        self._user_timestamps[user_id].append(now)
+        self._processed_events.add(event_id)
+        self._processed_order.append(event_id)
+        # FIFO acotado: al pasar el máximo sale solo el más viejo
+        if len(self._processed_order) > self._MAX_PROCESSED:
+            self._processed_events.discard(self._processed_order.popleft())
         return True
 
     async def _on_image(self, room, event: RoomMessageImage):
@@ -165,11 +278,11 @@ class MatrixBot:
         if not self._ready:
             return
         # Ignorar mensajes de antes del inicio
-        if self._start_token and event.server_timestamp < self._get_start_ms():
+        if self._start_token and event.server_timestamp < self._start_ms:
             return
         if event.sender == BOT_USER:
             return
-        if ALLOWED_ROOMS and room.room_id not in ALLOWED_ROOMS:
+        if not _ALLOW_ALL and room.room_id not in ALLOWED_ROOMS:
             return
 
         logger.info(f"🖼️ [{room.room_id}] {event.sender} envió una imagen: {event.body}")
@@ -181,47 +294,48 @@ class MatrixBot:
         file_path = os.path.join(tmp_dir, f"{event.event_id}_{event.body}")
         
         try:
-            # Descargar la imagen
-            resp = await self.client.download(event.url)
+            # Descargar la imagen directo a disco (nio la escribe por chunks, sin tenerla entera en RAM)
+            from nio import DownloadResponse
+            resp = await self.client.download(event.url, save_to=file_path)
             if isinstance(resp, DownloadResponse):
-                with open(file_path, "wb") as f:
-                    f.write(resp.body)
-                
                 logger.info(f"✅ Imagen descargada en: {file_path}")
                 
                 # Procesar con el agente
                 await self._set_typing(room.room_id, typing=True)
-                response = await self.agent.chat(
-                    user_message=event.body or "Analiza esta imagen",
-                    user_id=event.sender,
-                    room_id=room.room_id,
-                    images=[file_path]
+                async with self._agent_sem:
+                    response = await self.agent.chat(
+                        user_message=event.body or "Analiza esta imagen",
+                        user_id=event.sender,
+                        room_id=room.room_id,
+                        images=[file_path]
+                    )
+                self._typing_off(room.room_id)
+                await asyncio.gather(
+                    self._send(room.room_id, response),
+                    self._react(room.room_id, event.event_id, "👀"),
+                    return_exceptions=True,
                 )
-                await self._send(room.room_id, response)
-                await self._react(room.room_id, event.event_id, "👀")
             else:
                 logger.error(f"❌ Error descargando imagen: {resp}")
         except Exception as e:
             logger.exception(f"Error procesando imagen: {e}")
+            self._typing_off(room.room_id)
             await self._send(room.room_id, f"⚠️ Error al procesar la imagen: {str(e)}")
-        finally:
-            await self._set_typing(room.room_id, typing=False)
 
     async def _on_file(self, room, event: RoomMessageFile):
         """Callback para archivos (PDF, docs, etc.) — descarga, sube a Supabase, y guarda copia local."""
         if not self._ready:
             return
-        if self._start_token and event.server_timestamp < self._get_start_ms():
+        if self._start_token and event.server_timestamp < self._start_ms:
             return
         if event.sender == BOT_USER:
             return
-        if ALLOWED_ROOMS and room.room_id not in ALLOWED_ROOMS:
+        if not _ALLOW_ALL and room.room_id not in ALLOWED_ROOMS:
             return
 
         # Deduplicar
-        if event.event_id in self._processed_events:
+        if not self._mark_processed(event.event_id):
             return
-        self._processed_events.add(event.event_id)
 
         filename = event.body or "archivo"
         logger.info(f"📎 [{room.room_id}] {event.sender} envió archivo: {filename}")
@@ -236,6 +350,7 @@ class MatrixBot:
             await self._set_typing(room.room_id, typing=True)
 
             # Descargar archivo de Matrix
+            from nio import DownloadResponse
             resp = await self.client.download(event.url)
             if not isinstance(resp, DownloadResponse):
                 logger.error(f"❌ Error descargando archivo: {resp}")
@@ -270,25 +385,24 @@ class MatrixBot:
             logger.exception(f"Error procesando archivo: {e}")
             await self._send(room.room_id, f"⚠️ Error al procesar el archivo: {str(e)}")
         finally:
-            await self._set_typing(room.room_id, typing=False)
+            self._typing_off(room.room_id)
 
     async def _on_audio(self, room, event: RoomMessageAudio):
         """Callback para mensajes de voz / audio."""
         if not self._ready:
             return
-        if self._start_token and event.server_timestamp < self._get_start_ms():
+        if self._start_token and event.server_timestamp < self._start_ms:
             return
         if event.sender == BOT_USER:
             return
-        if ALLOWED_ROOMS and room.room_id not in ALLOWED_ROOMS:
+        if not _ALLOW_ALL and room.room_id not in ALLOWED_ROOMS:
             return
 
         logger.info(f"🎤 [{room.room_id}] {event.sender} envió audio: {event.body}")
 
         # Deduplicar
-        if event.event_id in self._processed_events:
+        if not self._mark_processed(event.event_id):
             return
-        self._processed_events.add(event.event_id)
 
         tmp_dir = "/tmp/jada_audio"
         os.makedirs(tmp_dir, exist_ok=True)
@@ -301,6 +415,7 @@ class MatrixBot:
 
         try:
             # Descargar audio
+            from nio import DownloadResponse
             resp = await self.client.download(event.url)
             if not isinstance(resp, DownloadResponse):
                 logger.error(f"❌ Error descargando audio: {resp}")
@@ -331,12 +446,13 @@ class MatrixBot:
                 logger.info(f"🔊 Voice intent detected. Cleaned: {agent_message[:60]}")
 
             # Enviar transcripción al agente como si fuera un mensaje de texto
-            response = await self.agent.chat(
-                user_message=agent_message,
-                user_id=event.sender,
-                room_id=room.room_id,
-                voice_only=wants_voice,
-            )
+            async with self._agent_sem:
+                response = await self.agent.chat(
+                    user_message=agent_message,
+                    user_id=event.sender,
+                    room_id=room.room_id,
+                    voice_only=wants_voice,
+                )
 
             # Si pidió audio, enviar como voz
             if wants_voice and response:
@@ -352,7 +468,7 @@ class MatrixBot:
             logger.exception(f"Error procesando audio: {e}")
             await self._send(room.room_id, f"⚠️ Error al procesar el audio: {str(e)}")
         finally:
-            await self._set_typing(room.room_id, typing=False)
+            self._typing_off(room.room_id)
             # Limpiar archivo temporal
             try:
                 if os.path.exists(file_path):
@@ -366,7 +482,7 @@ class MatrixBot:
         if not self._ready:
             return
         # Ignorar mensajes de antes del inicio
-        if self._start_token and event.server_timestamp < self._get_start_ms():
+        if self._start_token and event.server_timestamp < self._start_ms:
             return
 
         # Ignorar mensajes propios
@@ -374,7 +490,13 @@ class MatrixBot:
             return
 
         # Filtrar por rooms permitidos (si está configurado)
-        if ALLOWED_ROOMS and room.room_id not in ALLOWED_ROOMS:
+        if not _ALLOW_ALL and room.room_id not in ALLOWED_ROOMS:
+            return
+
+        # Deduplicar: ignorar si ya lo procesamos (protege contra doble instancia).
+        # Va antes de strip/rate limit/logging: un duplicado cuesta solo una búsqueda en el set
+        if not self._mark_processed(event.event_id):
+            logger.debug(f"Evento duplicado ignorado: {event.event_id}")
             return
 
         message = event.body.strip()
@@ -400,27 +522,6 @@ class MatrixBot:
             await self._handle_gym_message(room.room_id, event, message)
             return
 
-        # Deduplicar: ignorar si ya lo procesamos (protege contra doble instancia)
-        if event.event_id in self._processed_events:
-            logger.debug(f"Evento duplicado ignorado: {event.event_id}")
-            return
-        self._processed_events.add(event.event_id)
-        # Limpiar set si crece demasiado
-        if len(self._processed_events) > self._MAX_PROCESSED:
-            self._processed_events = set(list(self._processed_events)[-self._MAX_PROCESSED // 2:])
-
-        # Timeouts configurables
-        THINK_TIMEOUT   = int(os.getenv("JADA_THINK_TIMEOUT", "90"))   # seg máx para responder
-        NUDGE_AFTER     = int(os.getenv("JADA_NUDGE_AFTER",   "25"))   # seg antes de avisar
-
-        # Mensajes de progreso si tarda (humor negro incluído)
-        NUDGE_MSGS = [
-            "_Todavía estoy aquí, sólo pensando muy fuerte..._",
-            "_Procesando. Mi GPU imaginaria está ardiendo._",
-            "_Sigo viva. Esto está tardando más de lo normal._",
-        ]
-        import random as _rnd
-
         nudge_sent = False
         async def _nudge():
             """Avisa al usuario si la respuesta tarda demasiado (1 solo mensaje)."""
@@ -429,7 +530,7 @@ class MatrixBot:
             if not nudge_sent:
                 nudge_sent = True
                 try:
-                    await self._send(room.room_id, _rnd.choice(NUDGE_MSGS))
+                    await self._send(room.room_id, random.choice(NUDGE_MSGS))
                 except Exception:
                     pass
 
@@ -441,20 +542,22 @@ class MatrixBot:
         if wants_voice:
             agent_message = strip_voice_intent(message)
             logger.info(f"🔊 Voice intent detected. Cleaned: {agent_message[:60]}")
+        status = "✅"
         try:
             # Mostrar indicador "escribiendo..." mientras procesa
             await self._set_typing(room.room_id, typing=True)
-            response = await asyncio.wait_for(
-                self.agent.chat(
-                    user_message=agent_message,
-                    user_id=event.sender,
-                    room_id=room.room_id,
-                    voice_only=wants_voice,
-                ),
-                timeout=THINK_TIMEOUT,
-            )
+            # El nudge corre fuera del semáforo: avisa aunque el mensaje siga en cola
+            async with self._agent_sem:
+                response = await asyncio.wait_for(
+                    self.agent.chat(
+                        user_message=agent_message,
+                        user_id=event.sender,
+                        room_id=room.room_id,
+                        voice_only=wants_voice,
+                    ),
+                    timeout=THINK_TIMEOUT,
+                )
             nudge_task.cancel()
-            await self._react(room.room_id, event.event_id, "✅")
         except asyncio.TimeoutError:
             nudge_task.cancel()
             logger.warning(f"⏱️ Timeout ({THINK_TIMEOUT}s) procesando mensaje de {event.sender}")
@@ -462,23 +565,27 @@ class MatrixBot:
                 f"⚠️ Me trové pensando por más de {THINK_TIMEOUT}s y decidí rendirme. "
                 "La API de NIM está lenta hoy. Intenta de nuevo."
             )
-            await self._react(room.room_id, event.event_id, "❌")
+            status = "❌"
         except Exception as e:
             nudge_task.cancel()
             logger.exception(f"Error en agente: {e}")
             response = f"⚠️ Error procesando tu mensaje: {str(e)}"
-            await self._react(room.room_id, event.event_id, "❌")
-        finally:
-            # Siempre apagar el typing indicator
-            await self._set_typing(room.room_id, typing=False)
+            status = "❌"
+
+        # Apagar typing, reaccionar y responder son llamadas independientes: van en paralelo
+        self._typing_off(room.room_id)
+        pending = [self._react(room.room_id, event.event_id, status)]
 
         # Si el usuario pidió audio explícitamente, enviar como voz
         if response and wants_voice:
-            sent = await self.send_voice(room.room_id, response)
-            if sent:
+            *_, sent = await asyncio.gather(
+                *pending, self.send_voice(room.room_id, response), return_exceptions=True
+            )
+            if sent is True:
                 return  # ya se envió como audio
+            pending = []
 
-        await self._send(room.room_id, response)
+        await asyncio.gather(*pending, self._send(room.room_id, response), return_exceptions=True)
 
     # ── Gym Room Logic ──────────────────────────────────────────────────────
 
@@ -528,7 +635,7 @@ class MatrixBot:
         await self._set_typing(room_id, typing=True)
         try:
             import json as _json
-            import requests
+            import aiohttp
             from datetime import date
 
             all_text = "\n".join(self._gym_buffer)
@@ -561,7 +668,7 @@ Reglas:
             nvidia_key = os.getenv("NVIDIA_API_KEY", "")
             model = os.getenv("NVIDIA_FUNCTION_MODEL", "minimaxai/minimax-m2.5")
 
-            resp = requests.post(
+            async with self._get_http().post(
                 "https://integrate.api.nvidia.com/v1/chat/completions",
                 json={
                     "model": model,
@@ -576,18 +683,15 @@ Reglas:
                     "Authorization": f"Bearer {nvidia_key}",
                     "Content-Type": "application/json",
                 },
-                timeout=30,
-            )
-            resp.raise_for_status()
-            content = resp.json()["choices"][0]["message"]["content"]
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as resp:
+                resp.raise_for_status()
+                content = (await resp.json())["choices"][0]["message"]["content"]
 
             # Clean markdown if present
-            import re
             content = content.strip()
             if "```" in content:
-                content = re.sub(r'```json\s*', '', content)
-                content = re.sub(r'```\s*', '', content)
-                content = content.strip()
+                content = _CODE_FENCE.sub("", content).strip()
 
             # Extract first JSON object
             decoder = _json.JSONDecoder()
@@ -638,11 +742,11 @@ Reglas:
             logger.error(f"❌ Gym save error: {e}")
             await self._send(room_id, f"❌ Error procesando ejercicios: {str(e)}")
         finally:
-            await self._set_typing(room_id, typing=False)
+            self._typing_off(room_id)
 
     async def _on_megolm(self, room, event: MegolmEvent):
         """Callback para mensajes encriptados que no se pueden descifrar."""
-        if self._start_token and event.server_timestamp < self._get_start_ms():
+        if self._start_token and event.server_timestamp < self._start_ms:
             return
         if event.sender == BOT_USER:
             return
@@ -677,14 +781,9 @@ Reglas:
             if not mxc_url:
                 raise Exception("No se pudo obtener la URL MXC del archivo.")
             
-            import os
-            from PIL import Image
-            
-            # Obtener dimensiones e info básica
-            with Image.open(file_path) as img:
-                width, height = img.size
-                size = os.path.getsize(file_path)
-            
+            # Obtener dimensiones e info básica (Pillow bloquea: va en un hilo aparte)
+            width, height, size = await asyncio.to_thread(_image_meta, file_path)
+
             content = {
                 "body": body,
                 "info": {
@@ -697,11 +796,8 @@ Reglas:
                 "url": mxc_url
             }
             
-            await self.client.room_send(
-                room_id=room_id,
-                message_type="m.room.message",
-                content=content
-            )
+            # Por la outbox, igual que el texto: se conserva el orden de envío dentro del room
+            await self._enqueue(room_id, "m.room.message", content)
             logger.info(f"🖼️ Imagen enviada a {room_id}: {file_path}")
         except Exception as e:
             logger.error(f"❌ Error enviando imagen: {e}")
@@ -710,7 +806,6 @@ Reglas:
     async def send_file(self, room_id: str, file_path: str, body: str = ""):
         """Sube y envía cualquier archivo a un room de Matrix."""
         try:
-            import mimetypes
             mxc_url = await self._upload_file(file_path)
             if not mxc_url:
                 raise Exception("No se pudo obtener la URL MXC del archivo.")
@@ -730,11 +825,7 @@ Reglas:
                 "filename": filename,
             }
 
-            await self.client.room_send(
-                room_id=room_id,
-                message_type="m.room.message",
-                content=content,
-            )
+            await self._enqueue(room_id, "m.room.message", content)
             logger.info(f"📎 Archivo enviado a {room_id}: {file_path}")
         except Exception as e:
             logger.error(f"❌ Error enviando archivo: {e}")
@@ -772,11 +863,7 @@ Reglas:
                 "url": mxc_url,
             }
 
-            await self.client.room_send(
-                room_id=room_id,
-                message_type="m.room.message",
-                content=content,
-            )
+            await self._enqueue(room_id, "m.room.message", content)
             logger.info(f"🔊 Audio enviado a {room_id}: {file_path} ({duration_ms}ms)")
         except Exception as e:
             logger.error(f"❌ Error enviando audio: {e}")
@@ -810,23 +897,20 @@ Reglas:
 
     async def _upload_file(self, file_path: str) -> str:
         """Sube un archivo al homeserver y retorna su URL MXC."""
-        import mimetypes
         # Use stdlib mimetypes — no external dependencies needed
         content_type, _ = mimetypes.guess_type(file_path)
         if not content_type:
             ext = os.path.splitext(file_path)[1].lower()
-            content_type = {
-                ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
-                ".gif": "image/gif", ".webp": "image/webp",
-                ".mp3": "audio/mpeg", ".ogg": "audio/ogg", ".wav": "audio/wav",
-                ".mp4": "video/mp4", ".pdf": "application/pdf",
-            }.get(ext, "application/octet-stream")
-
-        with open(file_path, "rb") as f:
+            content_type = _EXT_MIME.get(ext, "application/octet-stream")
+
+        # aiofiles (dependencia de nio) lee el archivo sin bloquear el event loop
+        import aiofiles
+        async with aiofiles.open(file_path, "rb") as f:
             resp = await self.client.upload(
                 f,
                 content_type=content_type,
-                filename=os.path.basename(file_path)
+                filename=os.path.basename(file_path),
+                filesize=os.path.getsize(file_path),
             )
             
         from nio import UploadResponse
@@ -849,46 +933,100 @@ Reglas:
             for i, chunk in enumerate(chunks):
                 prefix = f"**(parte {i+1}/{len(chunks)})**\n" if len(chunks) > 1 else ""
                 await self._send_single(room_id, prefix + chunk)
-                if i < len(chunks) - 1:
-                    await asyncio.sleep(0.5)  # Delay entre chunks
 
     async def _send_single(self, room_id: str, text: str):
         """Enviar un mensaje individual al room."""
+        if not _has_markdown(text):
+            # Texto plano (avisos, confirmaciones): sin formatted_body que generar ni enviar
+            content = {**_PLAIN_TEMPLATE, "body": text}
+        else:
+            content = {**_HTML_TEMPLATE, "body": text, "formatted_body": _markdown_to_html(text)}
+        await self._enqueue(room_id, "m.room.message", content)
+
+    async def _enqueue(self, room_id: str, message_type: str, content: dict):
+        """Encolar un evento saliente. Sin outbox activo (antes de start(), tests) se envía directo."""
+        if self._outbox is None:
+            await self._room_send(room_id, message_type, content)
+        else:
+            await self._outbox.put((room_id, message_type, content))
+
+    async def _room_send(self, room_id: str, message_type: str, content: dict):
+        """Enviar un evento al homeserver, registrando el error si falla."""
         try:
             await self.client.room_send(
                 room_id=room_id,
-                message_type="m.room.message",
-                content={
-                    "msgtype": "m.text",
-                    "body": text,
-                    "format": "org.matrix.custom.html",
-                    "formatted_body": _markdown_to_html(text),
-                },
+                message_type=message_type,
+                content=content,
             )
         except Exception as e:
-            logger.error(f"❌ Error enviando mensaje a {room_id}: {e}")
+            if message_type == "m.reaction":
+                logger.debug(f"No se pudo enviar reacción {content['m.relates_to']['key']}: {e}")
+            else:
+                logger.error(f"❌ Error enviando mensaje a {room_id}: {e}")
+
+    async def _outbox_worker(self):
+        """Consume la outbox: agrupa lo que llega en una ventana corta y lo envía.
+
+        Los eventos de un mismo room se envían en orden; rooms distintos en paralelo.
+        """
+        while True:
+            batch = [await self._outbox.get()]
+            with contextlib.suppress(asyncio.TimeoutError):
+                while len(batch) < OUTBOX_MAX_BATCH:
+                    batch.append(await asyncio.wait_for(self._outbox.get(), OUTBOX_WINDOW))
+
+            by_room: dict[str, list[tuple[str, dict]]] = {}
+            for room_id, message_type, content in batch:
+                by_room.setdefault(room_id, []).append((message_type, content))
+
+            async def _flush(room_id: str, items: list[tuple[str, dict]]):
+                for message_type, content in items:
+                    await self._room_send(room_id, message_type, content)
+
+            try:
+                await asyncio.gather(*(_flush(r, items) for r, items in by_room.items()))
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
 
     @staticmethod
     def _split_message(text: str, max_len: int) -> list[str]:
-        """Dividir un mensaje largo en chunks, intentando cortar en saltos de línea."""
+        """Dividir un mensaje largo en chunks, intentando cortar en saltos de línea.
+
+        Recorre el texto con índices [i, end) sin recortar el string en cada vuelta:
+        solo se crea un slice por chunk.
+        """
         chunks = []
-        while len(text) > max_len:
+        i, end = 0, len(text)
+        while end - i > max_len:
+            limit = i + max_len
             # Buscar el último salto de línea dentro del límite
-            split_pos = text.rfind("\n", 0, max_len)
-            if split_pos == -1 or split_pos < max_len // 2:
+            split_pos = text.rfind("\n", i, limit)
+            if split_pos == -1 or split_pos - i < max_len // 2:
                 # Si no hay buen punto de corte, cortar en el espacio más cercano
-                split_pos = text.rfind(" ", 0, max_len)
+                split_pos = text.rfind(" ", i, limit)
             if split_pos == -1:
-                split_pos = max_len
+                split_pos = limit
 
-            chunks.append(text[:split_pos].strip())
-            text = text[split_pos:].strip()
+            chunks.append(text[i:split_pos].strip())
+            # Saltar espacios en ambos extremos de lo que queda
+            i = split_pos
+            while i < end and text[i].isspace():
+                i += 1
+            while end > i and text[end - 1].isspace():
+                end -= 1
 
-        if text:
-            chunks.append(text)
+        if i < end:
+            chunks.append(text[i:end])
 
         return chunks
 
+    def _typing_off(self, room_id: str):
+        """Apaga el typing indicator en segundo plano: el handler no espera ese round-trip."""
+        task = asyncio.create_task(self._set_typing(room_id, typing=False))
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+
     async def _set_typing(self, room_id: str, typing: bool, timeout: int = 30000):
         """Enviar indicador de escritura ('escribiendo...') al room."""
         try:
@@ -898,35 +1036,46 @@ Reglas:
 
     async def _react(self, room_id: str, event_id: str, emoji: str):
         """Enviar una reacción emoji a un evento."""
-        try:
-            await self.client.room_send(
-                room_id=room_id,
-                message_type="m.reaction",
-                content={
-                    "m.relates_to": {
-                        "rel_type": "m.annotation",
-                        "event_id": event_id,
-                        "key": emoji,
-                    }
-                },
-            )
-        except Exception as e:
-            logger.debug(f"No se pudo enviar reacción {emoji}: {e}")
+        await self._enqueue(room_id, "m.reaction", {
+            "m.relates_to": {
+                "rel_type": "m.annotation",
+                "event_id": event_id,
+                "key": emoji,
+            }
+        })
+
+
+def _image_meta(path: str) -> tuple[int, int, int]:
+    """Retorna (ancho, alto, bytes) de una imagen. Bloqueante: llamar con asyncio.to_thread."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        width, height = img.size
+    return width, height, os.path.getsize(path)
+
+
+def _md_repl(m: "re.Match[str]") -> str:
+    """Reemplazo de _MD_INLINE: el código queda literal; negrita y cursiva procesan su interior."""
+    code, bold, em = m.groups()
+    if code is not None:
+        return "<code>" + code + "</code>"
+    if bold is not None:
+        inner = _MD_INLINE.sub(_md_repl, bold) if "*" in bold or "`" in bold else bold
+        return "<b>" + inner + "</b>"
+    inner = _MD_INLINE.sub(_md_repl, em) if "*" in em or "`" in em else em
+    return "<em>" + inner + "</em>"
+
 
-    def _get_start_ms(self) -> int:
-        """Timestamp en ms de cuando arrancó el bot."""
-        return int(self._start_time * 1000) - 60_000  # 1 minuto de gracia
+def _has_markdown(text: str) -> bool:
+    """True si el texto contiene algún delimitador que _markdown_to_html convierte."""
+    return "*" in text or "`" in text or "\n" in text
 
 
 def _markdown_to_html(text: str) -> str:
-    """Conversión básica de Markdown a HTML para el cliente Matrix."""
-    import re
-    # Negrita
-    text = re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", text)
-    # Cursiva
-    text = re.sub(r"\*(.+?)\*", r"<em>\1</em>", text)
-    # Código inline
-    text = re.sub(r"`(.+?)`", r"<code>\1</code>", text)
-    # Saltos de línea
-    text = text.replace("\n", "<br>")
-    return text
+    """Conversión básica de Markdown a HTML para el cliente Matrix, en una sola pasada."""
+    # Caso común (confirmaciones, avisos, respuestas cortas): sin marcas no hay nada que convertir
+    if not _has_markdown(text):
+        return text
+    if "*" in text or "`" in text:
+        text = _MD_INLINE.sub(_md_repl, text)
+    return text.replace("\n", "<br>")
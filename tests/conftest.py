@@ -0,0 +1,22 @@
+"""
+tests/conftest.py — Configuración compartida de pytest
+
+Agrega el directorio raíz al path una sola vez por sesión, para que los
+tests puedan importar agent/, matrix/ y tools/ sin preámbulo propio.
+También define los fixtures caros que se comparten entre módulos.
+"""
+import os
+import sys
+
+import pytest
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+
+@pytest.fixture(scope="session")
+def agent_inst():
+    """Un solo Agent (config del LLM + registro de tools) para toda la sesión."""
+    from agent.agent import Agent
+    return Agent()
@@ -6,23 +6,41 @@ Tests Unitarios para módulo de CronJobs (Actualizado para Agno)
 import os
 import sys
 import json
+import shutil
 import unittest
 import tempfile
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, Mock
 
 # Agregar directorio raíz al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agent.scheduler import JadaScheduler
 from agno.scheduler.cron import validate_cron_expr
+from datetime import datetime
+from tools.cronjobs_model import Cronjob, CronjobManager, CronjobStatus, CronParser
+
+# Un único scheduler para todo el módulo: se crea (y carga su JSON) una sola vez
+_scheduler = None
+
+
+def setUpModule():
+    global _scheduler
+    _scheduler = JadaScheduler(Mock())  # Mock simple: el callback nunca usa métodos mágicos
+
+
+def _fresh_scheduler():
+    """Retorna el scheduler compartido sin jobs de tests anteriores"""
+    _scheduler._jobs.clear()
+    _scheduler._callback.reset_mock()
+    return _scheduler
 
 class TestCronjobAPI(unittest.TestCase):
     """Tests para la lógica de Cronjobs via Agno Tools"""
     
     def setUp(self):
-        """Setup con callback mock"""
-        self.mock_callback = MagicMock()
-        self.scheduler = JadaScheduler(self.mock_callback)
+        """Setup con el scheduler compartido (callback mock)"""
+        self.scheduler = _fresh_scheduler()
+        self.mock_callback = self.scheduler._callback
         
     def test_create_cronjob_valid(self):
         """Test crear cronjob con expresión válida (usando cron_expr)"""
@@ -47,8 +65,7 @@ class TestIntegration(unittest.TestCase):
 
     def test_model_to_api_to_model(self):
         """Test minimal data flow with correct field names"""
-        mock_cb = MagicMock()
-        sched = JadaScheduler(mock_cb)
+        sched = _fresh_scheduler()
         
         # Test add through scheduler logic
         job = sched.add_job(
@@ -62,5 +79,123 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(job["name"], "Model API Test")
         self.assertEqual(job["cron_expr"], "0 6 * * *")
 
+class TestCronjobManager(unittest.TestCase):
+    """Tests del gestor de cronjobs (almacenamiento en memoria y batch)"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Un solo directorio temporal para toda la clase; cada test usa su propio archivo
+        cls.tmpdir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+
+    def _storage_file(self):
+        return os.path.join(self.tmpdir, f"{self._testMethodName}.json")
+
+    def _job(self, id):
+        return Cronjob(id=id, name=f"Job {id}", expression="0 6 * * *", command="echo hola")
+
+    def test_in_memory_storage(self):
+        """Con storage={} no se toca el disco"""
+        storage = {}
+        manager = CronjobManager(storage=storage)
+        with patch("builtins.open") as mock_open:
+            self.assertTrue(manager.add(self._job("a")))
+            self.assertTrue(manager.update("a", name="Renombrado"))
+            mock_open.assert_not_called()
+        self.assertEqual(storage["a"].name, "Renombrado")
+        self.assertTrue(manager.delete("a"))
+        self.assertEqual(storage, {})
+
+    def test_batch_writes_once(self):
+        """batch() agrupa varias operaciones en una sola escritura"""
+        manager = CronjobManager(self._storage_file())
+        from tools import cronjobs_model
+        with patch.object(cronjobs_model, "_dumps", wraps=cronjobs_model._dumps) as mock_dump:
+            with manager.batch():
+                for i in range(3):
+                    manager.add(self._job(str(i)))
+                manager.delete("0")
+                mock_dump.assert_not_called()
+        self.assertEqual(mock_dump.call_count, 1)
+
+        reloaded = CronjobManager(manager.storage_file)
+        self.assertEqual(sorted(reloaded.cronjobs), ["1", "2"])
+
+    def test_wal_append_and_replay(self):
+        """add/update/delete van al WAL sin reescribir el snapshot; al recargar se reaplican"""
+        manager = CronjobManager(self._storage_file())
+        from tools import cronjobs_model
+        with patch.object(cronjobs_model, "_dumps", wraps=cronjobs_model._dumps) as mock_dump:
+            manager.add(self._job("a"))
+            manager.add(self._job("b"))
+            manager.update("a", name="Renombrado")
+            manager.delete("b")
+            mock_dump.assert_not_called()
+
+        # Una escritura cortada a mitad de línea se descarta al recargar
+        with open(manager.wal_file, "ab") as f:
+            f.write(b'{"op":"delete","id":"a"')
+
+        reloaded = CronjobManager(manager.storage_file)
+        self.assertEqual(sorted(reloaded.cronjobs), ["a"])
+        self.assertEqual(reloaded.cronjobs["a"].name, "Renombrado")
+        # La recarga compacta: el WAL queda vacío
+        self.assertEqual(os.path.getsize(manager.wal_file), 0)
+
+        # Fragmento cortado como PRIMERA línea (nada que reaplicar): igual se descarta,
+        # y los cambios posteriores sobreviven a la recarga
+        with open(manager.wal_file, "wb") as f:
+            f.write(b'{"op":"upsert","id":"x"')
+        torn = CronjobManager(manager.storage_file)
+        self.assertEqual(os.path.getsize(manager.wal_file), 0)
+        torn.add(self._job("c"))
+        torn.add(self._job("d"))
+        self.assertEqual(sorted(CronjobManager(manager.storage_file).cronjobs), ["a", "c", "d"])
+
+class TestCronjob(unittest.TestCase):
+    """Tests del modelo Cronjob"""
+
+    def test_to_dict_cache_invalidated_on_change(self):
+        """to_dict() se cachea, pero cualquier asignación de atributo lo invalida"""
+        job = Cronjob(id="a", name="Job", expression="0 6 * * *", command="echo hola")
+        first = job.to_dict()
+        first["name"] = "Modificado fuera"
+        self.assertEqual(job.to_dict()["name"], "Job")
+
+        job.name = "Renombrado"
+        job.status = CronjobStatus.PAUSED
+        self.assertEqual(job.to_dict()["name"], "Renombrado")
+        self.assertEqual(job.to_dict()["status"], "paused")
+
+    def test_from_dict_status(self):
+        """from_dict reutiliza el Enum y conserva estados fuera de él (ej. "completed")"""
+        data = Cronjob(id="a", name="Job", expression="0 6 * * *", command="echo").to_dict()
+        self.assertIs(Cronjob.from_dict(data).status, CronjobStatus.ACTIVE)
+        data["status"] = "completed"
+        self.assertEqual(Cronjob.from_dict(data).to_dict()["status"], "completed")
+
+class TestCronParser(unittest.TestCase):
+    """Tests del parser de expresiones cron"""
+
+    def test_masks_match_parsed_values(self):
+        """Los bitmasks contienen exactamente los valores de parse()"""
+        expr = "5,10 1-3 * 2 0"
+        parsed = CronParser.parse(expr)
+        masks = CronParser.parse_masks(expr)
+        for field, values in parsed.items():
+            self.assertEqual([v for v in range(64) if (masks[field] >> v) & 1], values)
+
+    def test_matches(self):
+        """matches() respeta minuto/hora y la semántica día OR día_semana de cron"""
+        sunday_6am = datetime(2026, 3, 1, 6, 0)
+        self.assertTrue(CronParser.matches("0 6 * * *", sunday_6am))
+        self.assertTrue(CronParser.matches("0 6 * * 0", sunday_6am))
+        self.assertFalse(CronParser.matches("0 6 * * 1", sunday_6am))
+        self.assertFalse(CronParser.matches("30 6 * * *", sunday_6am))
+        self.assertTrue(CronParser.matches("0 6 15 * 0", sunday_6am))
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
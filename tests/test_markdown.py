@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests de _markdown_to_html (formatted_body de los mensajes de Matrix)
+"""
+
+import os
+import sys
+import unittest
+
+# Agregar directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matrix.client import _markdown_to_html
+
+
+class TestMarkdownToHtml(unittest.TestCase):
+    """Fija el HTML que genera el conversor para cada tipo de marca"""
+
+    def test_plain_text_unchanged(self):
+        self.assertEqual(_markdown_to_html("Recordatorio creado."), "Recordatorio creado.")
+
+    def test_bold_and_italic(self):
+        self.assertEqual(_markdown_to_html("**hola** y *mundo*"), "<b>hola</b> y <em>mundo</em>")
+
+    def test_italic_inside_bold(self):
+        self.assertEqual(_markdown_to_html("**a *b* c**"), "<b>a <em>b</em> c</b>")
+
+    def test_bold_inside_italic(self):
+        self.assertEqual(_markdown_to_html("*a **b** c*"), "<em>a <b>b</b> c</em>")
+
+    def test_code_is_literal(self):
+        # Dentro de un span de código no se aplica negrita ni cursiva
+        self.assertEqual(_markdown_to_html("usa `a*b*c`"), "usa <code>a*b*c</code>")
+        self.assertEqual(_markdown_to_html("`**x**`"), "<code>**x**</code>")
+
+    def test_code_inside_bold(self):
+        self.assertEqual(_markdown_to_html("**ver `cfg`**"), "<b>ver <code>cfg</code></b>")
+
+    def test_unclosed_marks_stay_literal(self):
+        self.assertEqual(_markdown_to_html("2 * 3 y `x"), "2 * 3 y `x")
+
+    def test_marks_do_not_cross_lines(self):
+        self.assertEqual(_markdown_to_html("*a\nb*"), "*a<br>b*")
+
+    def test_headers_pass_through(self):
+        # Sin soporte de encabezados: el '#' queda literal y cada línea se separa con <br>
+        self.assertEqual(_markdown_to_html("# Título\ntexto"), "# Título<br>texto")
+
+    def test_lists(self):
+        self.assertEqual(
+            _markdown_to_html("- **uno**\n- *dos*\n- `tres`"),
+            "- <b>uno</b><br>- <em>dos</em><br>- <code>tres</code>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
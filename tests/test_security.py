@@ -3,13 +3,13 @@ tests/test_security.py — Tests de seguridad para Jada
 """
 import asyncio
 import json
+import mmap
 import os
-import sys
 import pytest
 from unittest.mock import MagicMock
 
-# Agregar el directorio raíz al path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# El directorio raíz lo agrega tests/conftest.py
+_AGENT_PY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent", "agent.py")
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TEST 1: Shell Blocklist
@@ -29,9 +29,10 @@ async def test_shell_blocklist():
         "shutdown -h now",
     ]
 
-    for cmd in dangerous_commands:
-        # La herramienta usa 'user', no 'user_id'
-        result = await run_command(cmd, user="test_user")
+    # Llamadas independientes: se lanzan en paralelo (la herramienta usa 'user', no 'user_id')
+    results = await asyncio.gather(*(run_command(cmd, user="test_user") for cmd in dangerous_commands))
+
+    for cmd, result in zip(dangerous_commands, results):
         blocked = "error" in str(result).lower() or "bloqueado" in str(result).lower() or "blocked" in str(result).lower()
         assert blocked, f"Comando peligroso NO bloqueado: {cmd}"
 
@@ -52,8 +53,9 @@ async def test_shell_injection():
         "echo hello $(rm -rf /)",
     ]
 
-    for cmd in injection_attempts:
-        result = await run_command(cmd, user="test_user")
+    results = await asyncio.gather(*(run_command(cmd, user="test_user") for cmd in injection_attempts))
+
+    for cmd, result in zip(injection_attempts, results):
         blocked = "error" in str(result).lower() or "bloqueado" in str(result).lower() or "blocked" in str(result).lower()
         # En la implementación actual, patrones como $( son bloqueados por CRITICAL_PATTERNS
         assert blocked, f"Inyección potencial detectada: {cmd}"
@@ -73,8 +75,9 @@ async def test_file_path_traversal():
         "../../../etc/passwd",
     ]
 
-    for path in sensitive_paths:
-        result = await read_file(path)
+    results = await asyncio.gather(*(read_file(path) for path in sensitive_paths))
+
+    for path, result in zip(sensitive_paths, results):
         # En este entorno específico (Docker/Root), /etc/shadow es legible.
         # El test debe verificar que si el archivo existe y es legible, al menos no sea un error de la herramienta.
         # En un entorno real Jada NO debe correr como root.
@@ -87,11 +90,8 @@ async def test_file_path_traversal():
 # TEST 4: JadaTools Schemas Válidos (Agno)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def test_tool_schemas_valid():
+def test_tool_schemas_valid(agent_inst):
     """Verificar que JadaTools está correctamente registrado en Agno."""
-    from agent.agent import Agent
-    
-    agent_inst = Agent()
     # Acceder a las herramientas registradas en el Agno Agent
     tools = agent_inst.agent.tools
     
@@ -115,14 +115,19 @@ def test_rate_limiting():
     bot = MatrixBot(mock_agent)
     test_user = "@test:example.com"
 
-    # Enviar mensajes dentro del límite
-    allowed_count = 0
-    for i in range(20):
-        if bot._check_rate_limit(test_user):
-            allowed_count += 1
+    # Intentar 20 mensajes de golpe: solo pasan los del límite
+    allowed_count = bot._check_rate_limit_bulk(test_user, 20)
 
     from matrix.client import RATE_LIMIT_PER_MINUTE
     assert allowed_count == RATE_LIMIT_PER_MINUTE
+    # Bucket agotado: el siguiente mensaje individual también se rechaza
+    assert not bot._check_rate_limit(test_user)
+
+    # Recarga analítica con el bucket presembrado: medio minuto = medio bucket, uno entero = tope
+    bot._user_buckets[test_user] = (0, 0)
+    assert bot._check_rate_limit_bulk(test_user, 20, now=30_000_000_000) == RATE_LIMIT_PER_MINUTE // 2
+    bot._user_buckets[test_user] = (0, 0)
+    assert bot._check_rate_limit_bulk(test_user, 20, now=120_000_000_000) == RATE_LIMIT_PER_MINUTE
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # TEST 6: Message Chunking
@@ -145,9 +150,7 @@ def test_message_chunking():
 
 def test_agent_logic_present():
     """Verificar que la lógica base del agente está presente."""
-    agent_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent", "agent.py")
-    with open(agent_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    assert "self.agent.arun" in content
-    assert "self._strip_thinking" in content
+    # Búsqueda a nivel de bytes sobre el archivo mapeado: sin leerlo ni decodificarlo entero
+    with open(_AGENT_PY, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        assert mm.find(b"self.agent.arun") != -1
+        assert mm.find(b"self._strip_thinking") != -1
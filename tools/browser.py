@@ -3,23 +3,34 @@ tools/browser.py — Control de browser con Playwright (headless/headed)
 """
 import os
 import base64
-from playwright.async_api import async_playwright, Browser, Page
+from collections import OrderedDict
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 from dotenv import load_dotenv
 
 load_dotenv()
 
 HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() == "true"
+# Páginas abiertas a la vez (una por sala); al pasarse se cierra la menos usada
+MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "4"))
+SCREENSHOT_QUALITY = int(os.getenv("BROWSER_SCREENSHOT_QUALITY", "75"))
+
+# innerText recortado en el navegador + longitud total (para el flag `truncated`)
+_TEXT_JS = "(n) => { const t = document.body.innerText; return [t.slice(0, n), t.length]; }"
 
 
 class BrowserTool:
-    """Singleton-like browser controller. Un solo browser compartido."""
+    """
+    Singleton-like browser controller. Un solo browser y un solo contexto compartidos
+    (cookies/storage comunes); cada sala navega en su propia página para no pisarse.
+    """
 
     _instance: "BrowserTool | None" = None
 
     def __init__(self):
         self._playwright = None
         self._browser: Browser | None = None
-        self._page: Page | None = None
+        self._context: BrowserContext | None = None
+        self._pages: OrderedDict[str, Page] = OrderedDict()
 
     @classmethod
     async def get_instance(cls) -> "BrowserTool":
@@ -31,58 +42,82 @@ class BrowserTool:
     async def _start(self):
         self._playwright = await async_playwright().start()
         self._browser = await self._playwright.chromium.launch(headless=HEADLESS)
-        self._page = await self._browser.new_page()
+        self._context = await self._browser.new_context()
+
+    async def _get_page(self, key: str = "") -> Page:
+        """Página asociada a `key` (p. ej. el room_id); la crea en el contexto compartido si no existe."""
+        page = self._pages.get(key)
+        if page is not None and not page.is_closed():
+            self._pages.move_to_end(key)
+            return page
+        self._pages.pop(key, None)
+        if len(self._pages) >= MAX_PAGES:
+            _, oldest = self._pages.popitem(last=False)
+            await oldest.close()
+        page = await self._context.new_page()
+        self._pages[key] = page
+        return page
 
-    async def navigate(self, url: str) -> dict:
+    async def navigate(self, url: str, key: str = "") -> dict:
         """Navegar a una URL."""
         try:
-            await self._page.goto(url, wait_until="domcontentloaded", timeout=15000)
-            return {"success": True, "url": self._page.url, "title": await self._page.title()}
+            page = await self._get_page(key)
+            await page.goto(url, wait_until="domcontentloaded", timeout=15000)
+            return {"success": True, "url": page.url, "title": await page.title()}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    async def get_page_text(self, max_chars: int = 3000) -> dict:
+    async def get_page_text(self, max_chars: int = 3000, key: str = "") -> dict:
         """Extraer texto visible de la página actual."""
         try:
-            text = await self._page.inner_text("body")
+            page = await self._get_page(key)
+            # Se recorta dentro de la página: por CDP solo viajan max_chars caracteres
+            text, total = await page.evaluate(_TEXT_JS, max_chars)
             return {
-                "url": self._page.url,
-                "text": text[:max_chars],
-                "truncated": len(text) > max_chars,
+                "url": page.url,
+                "text": text,
+                "truncated": total > max_chars,
             }
         except Exception as e:
             return {"error": str(e)}
 
-    async def click(self, selector: str) -> dict:
+    async def click(self, selector: str, key: str = "") -> dict:
         """Hacer click en un elemento (CSS selector o texto)."""
         try:
-            await self._page.click(selector, timeout=5000)
+            page = await self._get_page(key)
+            await page.click(selector, timeout=5000)
             return {"success": True, "selector": selector}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    async def fill(self, selector: str, text: str) -> dict:
+    async def fill(self, selector: str, text: str, key: str = "") -> dict:
         """Rellenar un campo de formulario."""
         try:
-            await self._page.fill(selector, text, timeout=5000)
+            page = await self._get_page(key)
+            await page.fill(selector, text, timeout=5000)
             return {"success": True, "selector": selector}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    async def screenshot(self) -> dict:
-        """Capturar screenshot de la página actual (base64 PNG)."""
+    async def screenshot(self, key: str = "") -> dict:
+        """Capturar screenshot del viewport actual (base64 JPEG, 5-10x más liviano que PNG)."""
         try:
-            screenshot_bytes = await self._page.screenshot(type="png")
-            b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
-            return {"success": True, "image_base64": b64, "url": self._page.url}
+            page = await self._get_page(key)
+            screenshot_bytes = await page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY, full_page=False)
+            b64 = base64.b64encode(screenshot_bytes).decode("ascii")
+            return {"success": True, "image_base64": b64, "mime_type": "image/jpeg", "url": page.url}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    async def get_current_url(self) -> dict:
-        return {"url": self._page.url if self._page else "No page open"}
+    async def get_current_url(self, key: str = "") -> dict:
+        page = self._pages.get(key)
+        return {"url": page.url if page else "No page open"}
 
     async def close(self):
         """Cerrar el browser."""
+        self._pages.clear()
+        if self._context:
+            await self._context.close()
         if self._browser:
             await self._browser.close()
         if self._playwright:
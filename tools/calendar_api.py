@@ -1,6 +1,9 @@
 import os
 import logging
 import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -11,32 +14,103 @@ logger = logging.getLogger(__name__)
 # Necesitamos permisos de leer y escribir eventos
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
 
+# Respuesta parcial: solo los campos que usamos (menos JSON que descargar y parsear)
+EVENT_FIELDS = "items(summary,start,location,description)"
+
 CREDENTIALS_FILE = os.path.join(os.path.dirname(__file__), '..', 'credentials.json')
 TOKEN_FILE = os.path.join(os.path.dirname(__file__), '..', 'token.json')
 
+# Servicio y credenciales cacheados (ver _get_calendar_service)
+_creds: Credentials | None = None
+_creds_lock = threading.Lock()
+_thread_local = threading.local()
+
+# Pool propio para las llamadas bloqueantes de la API: no compite con el executor por defecto
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="calendar")
+
+TZ_REFRESH = 3600  # segundos entre recálculos de la zona horaria local
+_local_tz_cache: tuple[float, str] | None = None
+
+BATCH_LIMIT = 50  # máximo de peticiones por batch HTTP de Google
+_REQUIRED_EVENT_KEYS = ("title", "start_datetime", "end_datetime")  # obligatorios en add_events
+
+# Caché corta de consultas: varias preguntas seguidas no repiten la llamada a la API
+CACHE_TTL = 60  # segundos
+_query_cache: dict[tuple, tuple[float, dict]] = {}
+
+
+def _get_credentials() -> Credentials:
+    """Credenciales compartidas: se leen de token.json una vez y se refrescan en sitio."""
+    global _creds
+    with _creds_lock:
+        creds = _creds
+        if creds is None and os.path.exists(TOKEN_FILE):
+            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+
+        # Si no hay credenciales o expiraron, intentamos refrescar el token
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+                # Sobreescribimos con el token fresquito
+                with open(TOKEN_FILE, 'w') as token:
+                    token.write(creds.to_json())
+            else:
+                raise RuntimeError(
+                    "Credenciales de Google no válidas. Debes ejecutar "
+                    "`python tools/google_auth.py` en la terminal primero para loguearte."
+                )
+        _creds = creds
+        return creds
+
+
 def _get_calendar_service():
-    """Obtiene el servicio autenticado de Google Calendar API."""
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    # Si no hay credenciales o expiraron, intentamos refrescar el token
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            # Sobreescribimos con el token fresquito
-            with open(TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
-        else:
-            raise RuntimeError(
-                "Credenciales de Google no válidas. Debes ejecutar "
-                "`python tools/google_auth.py` en la terminal primero para loguearte."
-            )
+    """Obtiene el servicio autenticado de Google Calendar API (uno por hilo del pool)."""
+    creds = _get_credentials()
+    # httplib2 no es thread-safe: cada hilo construye su servicio una sola vez y lo reutiliza.
+    # El refresh de las credenciales es en sitio, así que el servicio no hay que reconstruirlo.
+    service = getattr(_thread_local, "service", None)
+    if service is None:
+        service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+        _thread_local.service = service
+    return service
+
+
+def _simplify_event(event: dict) -> dict:
+    """Reduce un evento de la API a los campos que devuelve la tool."""
+    # Los eventos de todo el día solo tienen 'date', los demás 'dateTime'
+    start = event['start']
+    return {
+        "title": event.get('summary', 'Sin título'),
+        "start": start.get('dateTime') or start.get('date'),
+        "location": event.get('location', ''),
+        "description": (event.get('description') or '')[:500]
+    }
 
-    return build('calendar', 'v3', credentials=creds)
+
+def _cached_query(key: tuple, fetch) -> dict:
+    """Devuelve el resultado cacheado si tiene menos de CACHE_TTL; si no, llama a fetch()."""
+    hit = _query_cache.get(key)
+    now = time.monotonic()
+    if hit and now - hit[0] < CACHE_TTL:
+        return hit[1]
+    result = fetch()
+    if "error" not in result:  # los errores no se cachean
+        _query_cache[key] = (now, result)
+    return result
 
 
 def _get_today_events_sync() -> dict:
+    """Eventos de hoy, con caché corta por fecha."""
+    key = ("today", datetime.now().strftime("%Y-%m-%d"))
+    return _cached_query(key, _fetch_today_events)
+
+
+def _get_upcoming_events_sync(days: int = 7, limit: int = 15) -> dict:
+    """Próximos eventos, con caché corta por (days, limit)."""
+    return _cached_query(("upcoming", days, limit), lambda: _fetch_upcoming_events(days, limit))
+
+
+def _fetch_today_events() -> dict:
     """Obtener los eventos de hoy desde la API."""
     try:
         service = _get_calendar_service()
@@ -52,19 +126,8 @@ def _get_today_events_sync() -> dict:
 
         events_result = service.events().list(
             calendarId='primary', timeMin=time_min, timeMax=time_max,
-            singleEvents=True, orderBy='startTime').execute()
-        events = events_result.get('items', [])
-
-        today_events = []
-        for event in events:
-            # Los eventos de todo el día solo tienen 'date', los demás 'dateTime'
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            today_events.append({
-                "title": event.get('summary', 'Sin título'),
-                "start": start,
-                "location": event.get('location', ''),
-                "description": event.get('description', '')[:500] if event.get('description') else ''
-            })
+            singleEvents=True, orderBy='startTime', fields=EVENT_FIELDS).execute()
+        today_events = [_simplify_event(event) for event in events_result.get('items', [])]
 
         return {"date": start_of_day.strftime("%Y-%m-%d"), "events": today_events, "count": len(today_events)}
     except Exception as e:
@@ -72,7 +135,7 @@ def _get_today_events_sync() -> dict:
         return {"error": f"Error obteniendo eventos de hoy: {str(e)}"}
 
 
-def _get_upcoming_events_sync(days: int = 7, limit: int = 15) -> dict:
+def _fetch_upcoming_events(days: int = 7, limit: int = 15) -> dict:
     """Obtener los próximos N eventos desde la API."""
     try:
         service = _get_calendar_service()
@@ -85,18 +148,8 @@ def _get_upcoming_events_sync(days: int = 7, limit: int = 15) -> dict:
         events_result = service.events().list(
             calendarId='primary', timeMin=time_min, timeMax=time_max,
             maxResults=limit, singleEvents=True,
-            orderBy='startTime').execute()
-        events = events_result.get('items', [])
-
-        upcoming = []
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            upcoming.append({
-                "title": event.get('summary', 'Sin título'),
-                "start": start,
-                "location": event.get('location', ''),
-                "description": event.get('description', '')[:500] if event.get('description') else ''
-            })
+            orderBy='startTime', fields=EVENT_FIELDS).execute()
+        upcoming = [_simplify_event(event) for event in events_result.get('items', [])]
 
         return {
             "from": now.strftime("%Y-%m-%d"),
@@ -109,6 +162,27 @@ def _get_upcoming_events_sync(days: int = 7, limit: int = 15) -> dict:
         return {"error": f"Error obteniendo próximos eventos: {str(e)}"}
 
 
+def _local_tz() -> str:
+    """Zona horaria del equipo, recalculada como mucho una vez por hora (cambios de horario)."""
+    global _local_tz_cache
+    now = time.monotonic()
+    if _local_tz_cache is None or now - _local_tz_cache[0] > TZ_REFRESH:
+        _local_tz_cache = (now, datetime.now().astimezone().tzname() or 'America/Bogota')
+    return _local_tz_cache[1]
+
+
+def _event_body(title: str, start_datetime: str, end_datetime: str, description: str = "") -> dict:
+    """Cuerpo de events().insert para un evento."""
+    # Usa la zona horaria del equipo si no viaja en el ISO
+    tz = _local_tz()
+    return {
+        'summary': title,
+        'description': description,
+        'start': {'dateTime': start_datetime, 'timeZone': tz},
+        'end': {'dateTime': end_datetime, 'timeZone': tz},
+    }
+
+
 def _add_event_sync(title: str, start_datetime: str, end_datetime: str, description: str = "") -> dict:
     """
     Agrega un nuevo evento al calendario primario.
@@ -116,22 +190,10 @@ def _add_event_sync(title: str, start_datetime: str, end_datetime: str, descript
     """
     try:
         service = _get_calendar_service()
-        
-        event_body = {
-            'summary': title,
-            'description': description,
-            'start': {
-                'dateTime': start_datetime,
-                # Usa la zona horaria del equipo si no viaja en el ISO
-                'timeZone': datetime.now().astimezone().tzname() or 'America/Bogota',
-            },
-            'end': {
-                'dateTime': end_datetime,
-                'timeZone': datetime.now().astimezone().tzname() or 'America/Bogota',
-            },
-        }
+        event_body = _event_body(title, start_datetime, end_datetime, description)
 
         event = service.events().insert(calendarId='primary', body=event_body).execute()
+        _query_cache.clear()  # el evento nuevo debe verse en la próxima consulta
         
         return {
             "success": True,
@@ -143,21 +205,73 @@ def _add_event_sync(title: str, start_datetime: str, end_datetime: str, descript
         logger.error(f"Error al agregar evento: {str(e)}")
         return {"error": f"Error agregando el evento: {str(e)}"}
 
+
+def _add_events_sync(events: list[dict]) -> dict:
+    """
+    Agrega varios eventos en una sola petición batch (un round-trip por cada 50).
+    Cada evento: {"title", "start_datetime", "end_datetime", "description"?}
+    Si alguno viene incompleto no se crea ninguno (evita duplicados al reintentar).
+    """
+    invalid = [i for i, ev in enumerate(events)
+               if not isinstance(ev, dict) or not all(ev.get(k) for k in _REQUIRED_EVENT_KEYS)]
+    if invalid:
+        return {"error": f"Eventos incompletos en las posiciones {invalid} "
+                         f"(requieren {', '.join(_REQUIRED_EVENT_KEYS)}); no se creó ninguno"}
+    bodies = [_event_body(ev["title"], ev["start_datetime"], ev["end_datetime"], ev.get("description", ""))
+              for ev in events]
+
+    results: dict[int, dict] = {}
+
+    def _collect(request_id, response, exception):
+        i = int(request_id)
+        if exception is not None:
+            results[i] = {"title": events[i]["title"], "error": str(exception)}
+        else:
+            results[i] = {"title": events[i]["title"],
+                          "event_id": response.get('id'), "link": response.get('htmlLink')}
+
+    try:
+        service = _get_calendar_service()
+        # La API de batch acepta como máximo 50 peticiones por llamada
+        for offset in range(0, len(bodies), BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=_collect)
+            for i in range(offset, min(offset + BATCH_LIMIT, len(bodies))):
+                batch.add(service.events().insert(calendarId='primary', body=bodies[i]), request_id=str(i))
+            batch.execute()
+    except Exception as e:
+        logger.error(f"Error al agregar eventos: {str(e)}")
+        # Informar lo que sí se creó para que no se reintente (y duplique) esa parte
+        created = [results[i] for i in sorted(results) if "error" not in results[i]]
+        return {"error": f"Error agregando los eventos: {str(e)}", "events": created,
+                "count": len(created), "not_created": len(events) - len(created)}
+    finally:
+        _query_cache.clear()  # aun con error, parte de los eventos pudo haberse creado
+
+    done = [results[i] for i in sorted(results)]
+    failed = sum(1 for r in done if "error" in r)
+    return {"success": failed == 0, "events": done, "count": len(done) - failed, "failed": failed}
+
 # ─── Wrappers async ───────────────────────────────────────────────────────────
 
 async def get_today_events() -> dict:
     """Eventos de hoy via API."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _get_today_events_sync)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_EXECUTOR, _get_today_events_sync)
 
 
 async def get_upcoming_events(days: int = 7, limit: int = 15) -> dict:
     """Próximos eventos via API."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _get_upcoming_events_sync, days, limit)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_EXECUTOR, _get_upcoming_events_sync, days, limit)
 
 
 async def add_event(title: str, start_datetime: str, end_datetime: str, description: str = "") -> dict:
     """Agregar un evento al Google Calendar via API."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _add_event_sync, title, start_datetime, end_datetime, description)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_EXECUTOR, _add_event_sync, title, start_datetime, end_datetime, description)
+
+
+async def add_events(events: list[dict]) -> dict:
+    """Agregar varios eventos al Google Calendar en una sola petición batch."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_EXECUTOR, _add_events_sync, events)
@@ -6,30 +6,51 @@ Asistente: Qwen3-VL-30B (UI Design)
 Fecha: 2026-02-26
 """
 
-import json
+import asyncio
 import os
 import subprocess
 import threading
 import time
+from concurrent.futures import Future
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import Dict, List, Optional, Any
-from urllib.parse import parse_qs, urlparse
+from typing import Dict, Iterator, List, Optional, Any
+
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.exceptions import HTTPException as StarletteHTTPException
+import uvicorn
 
 # Importar modelo de datos
-from tools.cronjobs_model import Cronjob, CronjobManager, CronParser
+from tools.cronjobs_model import Cronjob, CronjobManager, CronParser, PERSIST_RUNNING_STATE, dumps_line
 
 # ConfiguraciÃ³n
 STORAGE_FILE = "cronjobs.json"
 PORT = 8080
 HOST = "0.0.0.0"
 
+# Sección del crontab del sistema que gestiona Jada
+CRON_BEGIN = "# Jada-CronJobs-BEGIN"
+CRON_END = "# Jada-CronJobs-END"
+CRON_SYNC_DEBOUNCE = 0.1  # segundos
+STREAM_CHUNK = 64 * 1024  # bytes por trozo al transmitir el listado
+MAX_CONCURRENT_RUNS = min(32, (os.cpu_count() or 1) * 4)  # ejecuciones /run simultáneas
+MAX_BODY = 1 << 20  # tamaño máximo del cuerpo JSON de una petición (1 MiB)
+
 class CronjobAPI:
     """API REST para gestionar CronJobs"""
     
     def __init__(self):
         self.manager = CronjobManager(STORAGE_FILE)
-        self.active_jobs: Dict[str, subprocess.Popen] = {}
+        self.active_jobs: Dict[str, Future] = {}
+        # Event loop propio (en un hilo) para /run: los comandos esperan en el loop, no en un hilo cada uno
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._run_sem = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+        # Crontab del sistema: se lee una vez y se reinstala con debounce
+        self._cron_lock = threading.Lock()
+        self._sync_timer: Optional[threading.Timer] = None
         
     def create_cronjob(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Crear un nuevo cronjob"""
@@ -77,6 +98,21 @@ class CronjobAPI:
         """Listar todos los cronjobs"""
         return [cj.to_dict() for cj in self.manager.list_all()]
     
+    def iter_cronjobs_json(self) -> Iterator[bytes]:
+        """Listado serializado por partes: cada cronjob se codifica por separado, sin armar la lista completa"""
+        buf = bytearray(b'{"status":"success","data":[')
+        first = True
+        for cj in self.manager.list_all():
+            if not first:
+                buf += b','
+            first = False
+            buf += dumps_line(cj.to_dict())
+            if len(buf) >= STREAM_CHUNK:
+                yield bytes(buf)
+                buf.clear()
+        buf += b']}'
+        yield bytes(buf)
+    
     def update_cronjob(self, job_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Actualizar un cronjob"""
         cronjob = self.manager.get(job_id)
@@ -102,7 +138,7 @@ class CronjobAPI:
             else:
                 self._unregister_system_cron(job_id)
         
-        self.manager.save()
+        self.manager.save_job(job_id)
         
         return {
             "status": "success",
@@ -127,22 +163,47 @@ class CronjobAPI:
         if not cronjob:
             return {"status": "error", "message": "Cronjob no encontrado"}
         
-        # Ejecutar en hilo separado
-        def execute():
+        running = self.active_jobs.get(job_id)
+        if running is not None and not running.done():
+            return {"status": "error", "message": f"Cronjob '{cronjob.name}' ya está en ejecución"}
+        
+        self.active_jobs[job_id] = asyncio.run_coroutine_threadsafe(
+            self._run_async(job_id, cronjob), self._get_loop()
+        )
+        
+        return {
+            "status": "success",
+            "message": f"Cronjob '{cronjob.name}' ejecutándose",
+            "execution_id": job_id
+        }
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop de ejecuciones; se arranca en su hilo la primera vez que se usa"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="cron-run", daemon=True).start()
+            return self._loop
+    
+    async def _run_async(self, job_id: str, cronjob: Cronjob):
+        """Ejecutar el comando de un cronjob como subproceso async"""
+        # Igual que el antiguo pool acotado: como mucho MAX_CONCURRENT_RUNS subprocesos a la vez;
+        # el resto espera aquí (sin marcarse "running") hasta que se libere un cupo
+        async with self._run_sem:
             try:
                 cronjob.status = "running"
                 cronjob.last_run = datetime.now()
-                self.manager.save()
+                if PERSIST_RUNNING_STATE:
+                    await asyncio.to_thread(self.manager.save_job, job_id)
                 
                 # Ejecutar comando
-                process = subprocess.Popen(
+                process = await asyncio.create_subprocess_shell(
                     cronjob.command,
-                    shell=True,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE
                 )
                 
-                stdout, stderr = process.communicate()
+                stdout, stderr = await process.communicate()
                 
                 cronjob.output = stdout.decode('utf-8', errors='replace')
                 cronjob.error = stderr.decode('utf-8', errors='replace')
@@ -152,18 +213,10 @@ class CronjobAPI:
             except Exception as e:
                 cronjob.error = str(e)
                 cronjob.status = "failed"
-            
-            cronjob.updated_at = datetime.now()
-            self.manager.save()
         
-        thread = threading.Thread(target=execute)
-        thread.start()
-        
-        return {
-            "status": "success",
-            "message": f"Cronjob '{cronjob.name}' ejecutÃ¡ndose",
-            "execution_id": job_id
-        }
+        cronjob.updated_at = datetime.now()
+        # Una sola escritura (WAL) con el estado final; el fsync va fuera del loop
+        await asyncio.to_thread(self.manager.save_job, job_id)
     
     def get_logs(self, job_id: str) -> Dict[str, Any]:
         """Obtener logs de ejecuciÃ³n de un cronjob"""
@@ -187,199 +240,226 @@ class CronjobAPI:
         # Una implementaciÃ³n completa usarÃ­a una librerÃ­a como python-crontab
         return None
     
+    def _cron_entry(self, cronjob: Cronjob) -> str:
+        """Líneas de crontab (comentario + entrada) de un cronjob"""
+        return (
+            f"# Jada CronJob: {cronjob.name}\n"
+            f"{cronjob.expression} cd {os.getcwd()} && {cronjob.command} >> logs/{cronjob.id}.log 2>&1"
+        )
+    
+    def _read_crontab_base(self) -> Optional[str]:
+        """Crontab actual del usuario sin la sección de Jada; None si no se pudo leer.
+
+        Se lee en cada sync (una vez por ráfaga gracias al debounce) para no pisar
+        cambios que el usuario haya hecho a mano desde la última instalación.
+        """
+        result = subprocess.run(
+            ['crontab', '-l'],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            # Sin crontab todavía es normal; cualquier otro error aborta el sync
+            if "no crontab" not in result.stderr.lower():
+                print(f"Error leyendo crontab: {result.stderr.strip()}")
+                return None
+            return ""
+        return _strip_jada_section(result.stdout)
+    
+    def bulk_sync(self):
+        """Reinstalar la sección de Jada con todos los cronjobs activos en un solo `crontab -`"""
+        with self._cron_lock:
+            try:
+                base = self._read_crontab_base()
+                if base is None:
+                    return
+                base = base.rstrip()
+                entries = [self._cron_entry(cj) for cj in self.manager.list_enabled()]
+                section = "\n".join([CRON_BEGIN, *entries, CRON_END])
+                new_crontab = f"{base}\n{section}\n" if base else f"{section}\n"
+                
+                result = subprocess.run(
+                    ['crontab', '-'],
+                    input=new_crontab,
+                    capture_output=True,
+                    text=True
+                )
+                if result.returncode != 0:
+                    print(f"Error instalando crontab: {result.stderr.strip()}")
+                
+            except Exception as e:
+                print(f"Error syncing system cron: {e}")
+    
+    def _schedule_sync(self):
+        """Programar bulk_sync con debounce: varios cambios seguidos = una sola instalación"""
+        with self._cron_lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+            # No es daemon: si el proceso sale, espera a que se aplique el último cambio
+            self._sync_timer = threading.Timer(CRON_SYNC_DEBOUNCE, self.bulk_sync)
+            self._sync_timer.start()
+    
     def _register_system_cron(self, cronjob: Cronjob):
         """Registrar cronjob en el sistema operativo"""
-        # Crear entrada de crontab
-        cron_entry = f"{cronjob.expression} cd {os.getcwd()} && {cronjob.command} >> logs/{cronjob.id}.log 2>&1"
-        
-        try:
-            # Obtener crontab actual
-            result = subprocess.run(
-                ['crontab', '-l'],
-                capture_output=True,
-                text=True
-            )
-            
-            current_crontab = result.stdout if result.returncode == 0 else ""
-            
-            # Agregar nueva entrada
-            new_crontab = current_crontab + f"\n# Jada CronJob: {cronjob.name}\n{cron_entry}\n"
-            
-            # Instalar nuevo crontab
-            subprocess.run(
-                ['crontab', '-'],
-                input=new_crontab,
-                text=True
-            )
-            
-        except Exception as e:
-            print(f"Error registering system cron: {e}")
+        self._schedule_sync()
     
     def _unregister_system_cron(self, job_id: str):
         """Eliminar cronjob del sistema operativo"""
-        try:
-            # Obtener crontab actual
-            result = subprocess.run(
-                ['crontab', '-l'],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                return
-            
-            # Filtrar entradas relacionadas con este job
-            lines = result.stdout.split('\n')
-            filtered_lines = []
-            skip = False
-            
-            for i, line in enumerate(lines):
-                if f"# Jada CronJob" in line or f"# Jada CronJob" in line:
-                    skip = True
-                    continue
-                if skip and line.strip().startswith('#'):
-                    skip = False
-                if not skip:
-                    filtered_lines.append(line)
-            
-            # Actualizar crontab
-            new_crontab = '\n'.join(filtered_lines)
-            subprocess.run(
-                ['crontab', '-'],
-                input=new_crontab,
-                text=True
-            )
-            
-        except Exception as e:
-            print(f"Error unregistering system cron: {e}")
+        self._schedule_sync()
+
+
+def _strip_jada_section(crontab: str) -> str:
+    """Quitar del crontab la sección gestionada por Jada (y entradas del formato anterior)"""
+    lines = []
+    in_section = False
+    skip_entry = False
+    for line in crontab.split('\n'):
+        if line == CRON_BEGIN:
+            in_section = True
+        elif line == CRON_END:
+            in_section = False
+        elif in_section:
+            continue
+        elif skip_entry:
+            skip_entry = False
+        elif line.startswith("# Jada CronJob"):
+            skip_entry = True  # formato anterior: comentario + una entrada, sin marcadores
+        else:
+            lines.append(line)
+    return '\n'.join(lines)
 
 
 # Instancia global de la API
 api = CronjobAPI()
 
 
-class APIHandler(BaseHTTPRequestHandler):
-    """HTTP Request Handler para la API"""
-    
-    def _send_json(self, status: int, data: Dict[str, Any]):
-        """Enviar respuesta JSON"""
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
-    
-    def do_GET(self):
-        """Manejar GET requests"""
-        parsed = urlparse(self.path)
-        path = parsed.path
-        
-        if path == '/api/cronjobs':
-            # Listar todos los cronjobs
-            self._send_json(200, {
-                "status": "success",
-                "data": api.list_cronjobs()
-            })
-        elif path.startswith('/api/cronjobs/'):
-            # Obtener un cronjob especÃ­fico o logs
-            parts = path.split('/')
-            job_id = parts[-1]
-            if parts[-2] == 'logs':
-                self._send_json(200, api.get_logs(job_id))
-            else:
-                cronjob = api.get_cronjob(job_id)
-                if cronjob:
-                    self._send_json(200, {
-                        "status": "success",
-                        "data": cronjob.to_dict()
-                    })
-                else:
-                    self._send_json(404, {"status": "error", "message": "No encontrado"})
-        else:
-            self._send_json(404, {"status": "error", "message": "Endpoint no encontrado"})
-    
-    def do_POST(self):
-        """Manejar POST requests"""
-        parsed = urlparse(self.path)
-        path = parsed.path
-        
-        if path == '/api/cronjobs':
-            # Crear nuevo cronjob
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length).decode()
-            
-            try:
-                data = json.loads(body)
-                result = api.create_cronjob(data)
-                
-                if result["status"] == "success":
-                    self._send_json(201, result)
-                else:
-                    self._send_json(400, result)
-                    
-            except json.JSONDecodeError:
-                self._send_json(400, {"status": "error", "message": "JSON invÃ¡lido"})
-                
-        elif path.startswith('/api/cronjobs/'):
-            # Ejecutar un cronjob ahora
-            parts = path.split('/')
-            if parts[-1] == 'run':
-                job_id = parts[-2]
-                self._send_json(200, api.run_now(job_id))
-            else:
-                self._send_json(404, {"status": "error", "message": "Endpoint no encontrado"})
-        else:
-            self._send_json(404, {"status": "error", "message": "Endpoint no encontrado"})
-    
-    def do_PUT(self):
-        """Manejar PUT requests"""
-        parsed = urlparse(self.path)
-        path = parsed.path
-        
-        if path.startswith('/api/cronjobs/'):
-            # Actualizar cronjob
-            job_id = path.split('/')[-1]
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length).decode()
-            
-            try:
-                data = json.loads(body)
-                result = api.update_cronjob(job_id, data)
-                
-                if result["status"] == "success":
-                    self._send_json(200, result)
-                else:
-                    self._send_json(404, result)
-                    
-            except json.JSONDecodeError:
-                self._send_json(400, {"status": "error", "message": "JSON invÃ¡lido"})
-        else:
-            self._send_json(404, {"status": "error", "message": "Endpoint no encontrado"})
-    
-    def do_DELETE(self):
-        """Manejar DELETE requests"""
-        parsed = urlparse(self.path)
-        path = parsed.path
-        
-        if path.startswith('/api/cronjobs/'):
-            # Eliminar cronjob
-            job_id = path.split('/')[-1]
-            result = api.delete_cronjob(job_id)
-            
-            if result["status"] == "success":
-                self._send_json(200, result)
-            else:
-                self._send_json(404, result)
-        else:
-            self._send_json(404, {"status": "error", "message": "Endpoint no encontrado"})
-    
-    def log_message(self, format, *args):
-        """Log personalizado"""
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {args[0]}")
+# Respuestas con el mismo serializador del modelo (orjson si está disponible)
+class _JSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps_line(content)
+
+
+app = FastAPI(
+    title="Jada CronJobs API",
+    description="API REST para gestión de CronJobs en Jada.",
+    default_response_class=_JSONResponse,
+)
+
+
+# --- Models ---
+class CronjobIn(BaseModel):
+    # Mismos valores por defecto que CronjobAPI.create_cronjob (se aceptan cuerpos parciales)
+    name: str = "Sin nombre"
+    expression: str = "* * * * *"
+    command: str = ""
+    description: str = ""
+    enabled: bool = True
+
+class CronjobUpdate(BaseModel):
+    name: Optional[str] = None
+    expression: Optional[str] = None
+    command: Optional[str] = None
+    description: Optional[str] = None
+    enabled: Optional[bool] = None
+
+
+# --- Errores con el mismo formato {"status", "message"} que el resto de la API ---
+@app.exception_handler(StarletteHTTPException)
+async def _http_error(request: Request, exc: StarletteHTTPException):
+    message = "Endpoint no encontrado" if exc.status_code == 404 else str(exc.detail)
+    return _JSONResponse({"status": "error", "message": message}, status_code=exc.status_code)
+
+@app.exception_handler(RequestValidationError)
+async def _validation_error(request: Request, exc: RequestValidationError):
+    return _JSONResponse({"status": "error", "message": "JSON inválido"}, status_code=400)
+
+class _BodyLimit:
+    """Middleware ASGI: 413 si el cuerpo supera MAX_BODY, con o sin Content-Length (chunked)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and (not length.isdigit() or int(length) > MAX_BODY):
+            return await _too_large()(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            # El tope se aplica mientras se lee el stream, no solo según el header
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > MAX_BODY:
+                    raise StarletteHTTPException(413, "Cuerpo demasiado grande")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _too_large() -> JSONResponse:
+    return _JSONResponse({"status": "error", "message": "Cuerpo demasiado grande"}, status_code=413)
+
+
+app.add_middleware(_BodyLimit)
+
+
+# --- Endpoints (def síncronos: FastAPI los corre en su threadpool) ---
+@app.get("/api/cronjobs")
+def list_cronjobs():
+    """Listar todos los cronjobs"""
+    return StreamingResponse(api.iter_cronjobs_json(), media_type="application/json")
+
+@app.post("/api/cronjobs", status_code=201)
+def create_cronjob(body: CronjobIn):
+    """Crear nuevo cronjob"""
+    result = api.create_cronjob(body.model_dump())
+    if result["status"] != "success":
+        return _JSONResponse(result, status_code=400)
+    return result
+
+@app.get("/api/cronjobs/{job_id}")
+def get_cronjob(job_id: str):
+    """Obtener un cronjob específico"""
+    cronjob = api.get_cronjob(job_id)
+    if not cronjob:
+        return _JSONResponse({"status": "error", "message": "No encontrado"}, status_code=404)
+    return {"status": "success", "data": cronjob.to_dict()}
+
+@app.get("/api/cronjobs/{job_id}/logs")
+@app.get("/api/cronjobs/logs/{job_id}")  # forma anterior, por compatibilidad
+def get_logs(job_id: str):
+    """Ver logs de un cronjob"""
+    return api.get_logs(job_id)
+
+@app.post("/api/cronjobs/{job_id}/run")
+def run_cronjob(job_id: str):
+    """Ejecutar un cronjob ahora"""
+    return api.run_now(job_id)
+
+@app.put("/api/cronjobs/{job_id}")
+def update_cronjob(job_id: str, body: CronjobUpdate):
+    """Actualizar cronjob (solo los campos enviados)"""
+    result = api.update_cronjob(job_id, body.model_dump(exclude_unset=True))
+    if result["status"] != "success":
+        return _JSONResponse(result, status_code=404)
+    return result
+
+@app.delete("/api/cronjobs/{job_id}")
+def delete_cronjob(job_id: str):
+    """Eliminar cronjob"""
+    result = api.delete_cronjob(job_id)
+    if result["status"] != "success":
+        return _JSONResponse(result, status_code=404)
+    return result
 
 
 def run_server():
     """Iniciar el servidor API"""
-    server = HTTPServer((HOST, PORT), APIHandler)
     print(f"ðŸš€ Servidor API de CronJobs ejecutÃ¡ndose en http://{HOST}:{PORT}")
     print(f"ðŸ“‹ Endpoints disponibles:")
     print(f"   GET    /api/cronjobs              - Listar todos")
@@ -390,11 +470,12 @@ def run_server():
     print(f"   PUT    /api/cronjobs/<id>         - Actualizar")
     print(f"   DELETE /api/cronjobs/<id>         - Eliminar")
     
+    # loop/http "auto": uvicorn usa uvloop y httptools cuando están instalados
     try:
-        server.serve_forever()
+        uvicorn.run(app, host=HOST, port=PORT, loop="auto", http="auto", workers=1, access_log=False)
     except KeyboardInterrupt:
-        print("\nðŸ‘‹ Servidor detenido")
-        server.shutdown()
+        pass
+    print("\n👋 Servidor detenido")
 
 
 if __name__ == "__main__":
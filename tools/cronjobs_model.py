@@ -6,9 +6,57 @@ Fecha: 2026-02-26
 """
 
 import json
+import mmap
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List, Dict, Any
 from enum import Enum
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple, Iterator, MutableMapping
+
+# orjson (opcional) serializa/parsea directo en bytes y bastante más rápido que json
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _loads_buffer = orjson.loads  # acepta memoryview: parsea sin copiar el buffer
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def dumps_line(obj: Any) -> bytes:
+        """JSON compacto en bytes, en una sola línea (WAL y respuestas de la API)"""
+        return orjson.dumps(obj)
+except ImportError:
+    _loads = json.loads
+
+    def _loads_buffer(buf: memoryview) -> Any:
+        return json.loads(bytes(buf))
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+    def dumps_line(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _load_json_file(path: str) -> Any:
+    """Parsear un archivo JSON mapeado en memoria (con orjson, sin copia intermedia a bytes)"""
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # un archivo vacío no se puede mapear
+            raise json.JSONDecodeError("Archivo vacío", "", 0)
+    with mm, memoryview(mm) as view:
+        return _loads_buffer(view)
+
+
+# "running" es transitorio (se reconstruye al arrancar): por defecto no se persiste,
+# solo el estado final de cada ejecución
+PERSIST_RUNNING_STATE = os.getenv("CRON_PERSIST_RUNNING", "false").lower() == "true"
 
 class CronjobStatus(Enum):
     ACTIVE = "active"
@@ -16,41 +64,46 @@ class CronjobStatus(Enum):
     RUNNING = "running"
     FAILED = "failed"
 
+# Valor serializado de cada estado, precalculado para to_dict()
+_STATUS_VALUES = {s: s.value for s in CronjobStatus}
+# Inverso para from_dict: lookup directo, sin construir el Enum en cada carga
+_STATUS_BY_VALUE = {s.value: s for s in CronjobStatus}
+
+@dataclass(slots=True, eq=False)
 class Cronjob:
-    """Modelo de datos para un CronJob"""
+    """Modelo de datos para un CronJob (slots: sin __dict__ por instancia)"""
     
-    def __init__(
-        self,
-        id: str,
-        name: str,
-        expression: str,  # ExpresiÃ³n cron: "0 6 * * *"
-        command: str,      # Comando a ejecutar: "python main.py --task X"
-        description: str = "",
-        enabled: bool = True,
-        last_run: Optional[datetime] = None,
-        next_run: Optional[datetime] = None,
-        status: CronjobStatus = CronjobStatus.ACTIVE,
-        output: str = "",
-        error: str = "",
-        created_at: datetime = datetime.now(),
-        updated_at: datetime = datetime.now()
-    ):
-        self.id = id
-        self.name = name
-        self.expression = expression
-        self.command = command
-        self.description = description
-        self.enabled = enabled
-        self.last_run = last_run
-        self.next_run = next_run
-        self.status = status
-        self.output = output
-        self.error = error
-        self.created_at = created_at
-        self.updated_at = updated_at
+    id: str
+    name: str
+    expression: str  # Expresión cron: "0 6 * * *"
+    command: str      # Comando a ejecutar: "python main.py --task X"
+    description: str = ""
+    enabled: bool = True
+    last_run: Optional[datetime] = None
+    next_run: Optional[datetime] = None
+    status: CronjobStatus = CronjobStatus.ACTIVE
+    output: str = ""
+    error: str = ""
+    # default_factory: cada cronjob con su propia fecha (no la de cuando se importó el módulo)
+    created_at: datetime = field(default_factory=datetime.now)
+    updated_at: datetime = field(default_factory=datetime.now)
+    _dict_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Cualquier cambio de atributo invalida el dict serializado cacheado
+        object.__setattr__(self, name, value)
+        if name != "_dict_cache":
+            object.__setattr__(self, "_dict_cache", None)
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convertir a diccionario para JSON"""
+        """Convertir a diccionario para JSON (cacheado hasta la próxima modificación)"""
+        cached = self._dict_cache
+        if cached is None:
+            cached = self._dict_cache = self._build_dict()
+        return dict(cached)  # copia: quien lo reciba puede modificarlo sin tocar la caché
+    
+    def _build_dict(self) -> Dict[str, Any]:
+        """Construir el diccionario serializable"""
         return {
             "id": self.id,
             "name": self.name,
@@ -60,7 +113,8 @@ class Cronjob:
             "enabled": self.enabled,
             "last_run": self.last_run.isoformat() if self.last_run else None,
             "next_run": self.next_run.isoformat() if self.next_run else None,
-            "status": self.status.value,
+            # El scheduler a veces asigna el string directamente (CronjobStatus.X.value)
+            "status": _STATUS_VALUES.get(self.status, self.status),
             "output": self.output,
             "error": self.error,
             "created_at": self.created_at.isoformat(),
@@ -71,7 +125,7 @@ class Cronjob:
     def from_dict(cls, data: Dict[str, Any]) -> 'Cronjob':
         """Crear desde diccionario"""
         return cls(
-            id=data["id"],
+            id=sys.intern(data["id"]),  # las claves de CronjobManager.cronjobs: hash cacheado y sin duplicados
             name=data["name"],
             expression=data["expression"],
             command=data["command"],
@@ -79,7 +133,8 @@ class Cronjob:
             enabled=data.get("enabled", True),
             last_run=datetime.fromisoformat(data["last_run"]) if data.get("last_run") else None,
             next_run=datetime.fromisoformat(data["next_run"]) if data.get("next_run") else None,
-            status=CronjobStatus(data.get("status", "active")),
+            # Estados fuera del Enum (ej. "completed" de run_now) se conservan como string
+            status=_STATUS_BY_VALUE.get(data.get("status", "active"), data.get("status")),
             output=data.get("output", ""),
             error=data.get("error", ""),
             created_at=datetime.fromisoformat(data["created_at"]),
@@ -88,23 +143,46 @@ class Cronjob:
     
     def to_json(self) -> str:
         """Convertir a JSON"""
-        return json.dumps(self.to_dict(), indent=2)
+        return _dumps(self.to_dict()).decode()
 
 
 class CronjobManager:
-    """Gestor de CronJobs con persistencia"""
+    """
+    Gestor de CronJobs con persistencia.
+
+    Cada add/update/delete agrega una línea al WAL (`<storage_file>.wal`) en vez de
+    reescribir todo el JSON; save() escribe el snapshot completo y vacía el WAL.
+    """
+
+    WAL_COMPACT_EVERY = 200  # entradas de WAL antes de compactar en un snapshot
     
-    def __init__(self, storage_file: str = "cronjobs.json"):
+    def __init__(
+        self,
+        storage_file: Optional[str] = "cronjobs.json",
+        *,
+        storage: Optional[MutableMapping[str, Cronjob]] = None
+    ):
+        """
+        storage: mapping en memoria (ej. {} en tests). Si se pasa, no se toca
+        ningún archivo: los cronjobs viven solo en ese mapping.
+        """
         self.storage_file = storage_file
-        self.cronjobs: Dict[str, Cronjob] = {}
-        self.load()
+        self._in_memory = storage is not None
+        self._batch_depth = 0
+        self._dirty = False
+        self._wal_entries = 0
+        self._io_lock = threading.RLock()  # WAL y snapshot se escriben desde varios hilos (API)
+        self.wal_file = None if self._in_memory else f"{storage_file}.wal"
+        self.cronjobs: MutableMapping[str, Cronjob] = storage if self._in_memory else {}
+        if not self._in_memory:
+            self.load()
     
     def add(self, cronjob: Cronjob) -> bool:
         """Agregar un cronjob"""
         if cronjob.id in self.cronjobs:
             return False
         self.cronjobs[cronjob.id] = cronjob
-        self.save()
+        self._log("upsert", cronjob.id)
         return True
     
     def get(self, id: str) -> Optional[Cronjob]:
@@ -121,7 +199,7 @@ class CronjobManager:
             if hasattr(cronjob, key):
                 setattr(cronjob, key, value)
         cronjob.updated_at = datetime.now()
-        self.save()
+        self._log("upsert", id)
         return True
     
     def delete(self, id: str) -> bool:
@@ -129,7 +207,7 @@ class CronjobManager:
         if id not in self.cronjobs:
             return False
         del self.cronjobs[id]
-        self.save()
+        self._log("delete", id)
         return True
     
     def list_all(self) -> List[Cronjob]:
@@ -140,27 +218,135 @@ class CronjobManager:
         """Listar solo los cronjobs activos"""
         return [cj for cj in self.cronjobs.values() if cj.enabled]
     
+    @contextmanager
+    def batch(self) -> Iterator["CronjobManager"]:
+        """Agrupa varias operaciones add/update/delete en una sola escritura al salir."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self.save()
+    
+    def _log(self, op: str, id: str) -> None:
+        """Registra un cambio de un solo cronjob en el WAL (append + fsync)."""
+        if self._in_memory:
+            return
+        if self._batch_depth:
+            self._dirty = True  # el batch termina con un snapshot completo
+            return
+        entry = {"op": op, "id": id}
+        if op == "upsert":
+            entry["job"] = self.cronjobs[id].to_dict()
+        with self._io_lock:
+            with open(self.wal_file, 'ab') as f:
+                f.write(dumps_line(entry) + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._wal_entries += 1
+            if self._wal_entries >= self.WAL_COMPACT_EVERY:
+                self.save()
+    
+    def save_job(self, id: str) -> None:
+        """Persiste solo el cronjob `id` (tras modificar sus atributos directamente)."""
+        if id in self.cronjobs:
+            self._log("upsert", id)
+    
     def save(self) -> None:
-        """Guardar a archivo JSON"""
-        data = {
-            "version": "1.0",
-            "last_update": datetime.now().isoformat(),
-            "cronjobs": {id: cj.to_dict() for id, cj in self.cronjobs.items()}
-        }
-        with open(self.storage_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        """Guardar el snapshot completo a archivo JSON (y vaciar el WAL)"""
+        if self._in_memory:
+            return
+        if self._batch_depth:
+            self._dirty = True  # se escribe una sola vez al cerrar el batch
+            return
+        with self._io_lock:
+            self._dirty = False
+            data = {
+                "version": "1.0",
+                "last_update": datetime.now().isoformat(),
+                "cronjobs": {id: cj.to_dict() for id, cj in list(self.cronjobs.items())}
+            }
+            # Escritura atómica: un corte a mitad nunca deja el snapshot a medias
+            tmp_file = f"{self.storage_file}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.storage_file)
+            # El rename debe ser durable antes de vaciar el WAL, o un crash pierde ambos
+            _fsync_dir(self.storage_file)
+            if self._wal_entries or os.path.exists(self.wal_file):
+                open(self.wal_file, 'wb').close()
+            self._wal_entries = 0
     
     def load(self) -> None:
-        """Cargar desde archivo JSON"""
+        """Cargar desde archivo JSON y reaplicar el WAL pendiente"""
         try:
-            with open(self.storage_file, 'r') as f:
-                data = json.load(f)
+            data = _load_json_file(self.storage_file)
             for id, cj_data in data.get("cronjobs", {}).items():
                 self.cronjobs[id] = Cronjob.from_dict(cj_data)
         except FileNotFoundError:
             self.cronjobs = {}
-        except json.JSONDecodeError:
+        except json.JSONDecodeError:  # orjson.JSONDecodeError hereda de esta
             self.cronjobs = {}
+        
+        replayed = 0
+        torn = False
+        try:
+            with open(self.wal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = _loads(line)
+                    except json.JSONDecodeError:
+                        torn = True
+                        break  # última línea cortada por un crash: se descarta
+                    if entry["op"] == "upsert":
+                        self.cronjobs[entry["id"]] = Cronjob.from_dict(entry["job"])
+                    else:
+                        self.cronjobs.pop(entry["id"], None)
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        if replayed or torn:
+            # Compactar: el WAL ya quedó reflejado en el snapshot, y un fragmento cortado
+            # no debe quedar al final (la próxima entrada se pegaría a esa misma línea)
+            self.save()
+
+
+def _fsync_dir(path: str) -> None:
+    """fsync del directorio que contiene `path` (persiste renames); no disponible en Windows"""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Campos de una expresión cron con sus rangos válidos
+_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 6),
+)
+
+# Valores de "*" por campo, precalculados (no se reconstruyen en cada parse)
+_ALL_MINUTE = tuple(range(60))
+_ALL_HOUR = tuple(range(24))
+_ALL_DAY = tuple(range(1, 32))
+_ALL_MONTH = tuple(range(1, 13))
+_ALL_WEEKDAY = tuple(range(7))
+_ALL_VALUES = {
+    (0, 59): _ALL_MINUTE,
+    (0, 23): _ALL_HOUR,
+    (1, 31): _ALL_DAY,
+    (1, 12): _ALL_MONTH,
+    (0, 6): _ALL_WEEKDAY,
+}
 
 
 # Parser de expresiones cron (bÃ¡sico)
@@ -173,60 +359,112 @@ class CronParser:
         Parsear expresiÃ³n cron "minuto hora dÃ­a mes dÃ­a_semana"
         Retorna diccionario con campos separados
         """
-        parts = expression.split()
-        if len(parts) != 5:
-            raise ValueError("ExpresiÃ³n cron debe tener 5 campos")
-        
-        return {
-            "minute": CronParser._parse_field(parts[0], 0, 59),
-            "hour": CronParser._parse_field(parts[1], 0, 23),
-            "day": CronParser._parse_field(parts[2], 1, 31),
-            "month": CronParser._parse_field(parts[3], 1, 12),
-            "weekday": CronParser._parse_field(parts[4], 0, 6)
-        }
+        fields = _parse_cached(expression)
+        return {name: list(values) for (name, _, _), values in zip(_FIELDS, fields)}
     
     @staticmethod
     def _parse_field(value: str, min_val: int, max_val: int) -> List[int]:
         """Parsear un campo individual"""
-        result = []
+        return list(_parse_field_cached(value, min_val, max_val))
+
+    @staticmethod
+    def _parse_field_uncached(value: str, min_val: int, max_val: int) -> List[int]:
+        # Se acumula directo en un set: sin lista intermedia ni copia extra al ordenar
+        result = set()
         for part in value.split(','):
             if '-' in part:
                 start, end = map(int, part.split('-'))
-                result.extend(range(start, end + 1))
+                result.update(range(start, end + 1))
             elif part == '*':
-                result.extend(range(min_val, max_val + 1))
+                result.update(range(min_val, max_val + 1))
             else:
                 val = int(part)
                 if min_val <= val <= max_val:
-                    result.append(val)
-        return sorted(list(set(result)))
+                    result.add(val)
+        return sorted(result)
+    
+    @staticmethod
+    def parse_masks(expression: str) -> Dict[str, int]:
+        """
+        Igual que parse() pero cada campo es un bitmask (bit n = valor n permitido).
+        Para chequear un valor basta un AND: (mask >> valor) & 1
+        """
+        return dict(zip((name for name, _, _ in _FIELDS), _parse_masks_cached(expression)))
+    
+    @staticmethod
+    def matches(expression: str, when: datetime) -> bool:
+        """Indica si la expresión cron dispara en el minuto de `when`"""
+        minute, hour, day, month, weekday = _parse_masks_cached(expression)
+        if not ((minute >> when.minute) & (hour >> when.hour) & (month >> when.month) & 1):
+            return False
+        day_ok = (day >> when.day) & 1
+        weekday_ok = (weekday >> (when.isoweekday() % 7)) & 1  # cron: 0 = domingo
+        # Como en cron: si día y día_semana están restringidos, basta con que coincida uno
+        if day != _ALL_MASKS[2] and weekday != _ALL_MASKS[4]:
+            return bool(day_ok or weekday_ok)
+        return bool(day_ok and weekday_ok)
     
     @staticmethod
     def to_human_readable(expression: str) -> str:
         """Convertir expresiÃ³n cron a texto legible"""
-        parsed = CronParser.parse(expression)
-        
-        parts = []
+        minutes, hours = _parse_cached(expression)[:2]
         
         # Minuto
-        if parsed["minute"] == list(range(60)):
+        if minutes == _ALL_MINUTE:
             minute_str = "cada minuto"
-        elif parsed["minute"] == [0]:
+        elif minutes == (0,):
             minute_str = "en punto"
         else:
-            minute_str = f"minutos {parsed['minute']}"
+            minute_str = f"minutos {list(minutes)}"
         
         # Hora
-        if parsed["hour"] == list(range(24)):
+        if hours == _ALL_HOUR:
             hour_str = "cada hora"
-        elif len(parsed["hour"]) == 1:
-            hour_str = f"a las {parsed['hour'][0]}:00"
+        elif len(hours) == 1:
+            hour_str = f"a las {hours[0]}:00"
         else:
-            hour_str = f"a las {parsed['hour']}"
+            hour_str = f"a las {list(hours)}"
         
         return f"{minute_str} {hour_str}"
 
 
+@lru_cache(maxsize=256)
+def _parse_cached(expression: str) -> Tuple[Tuple[int, ...], ...]:
+    """Parsea una expresión cron a tuplas inmutables; cacheado (hay pocas expresiones distintas)."""
+    parts = expression.split()
+    if len(parts) != 5:
+        raise ValueError("Expresión cron debe tener 5 campos")
+    return tuple(
+        _ALL_VALUES[(min_val, max_val)] if part == '*'
+        else _parse_field_cached(part, min_val, max_val)
+        for part, (_, min_val, max_val) in zip(parts, _FIELDS)
+    )
+
+
+@lru_cache(maxsize=2048)
+def _parse_field_cached(value: str, min_val: int, max_val: int) -> Tuple[int, ...]:
+    """Un campo parseado (cacheado): expresiones distintas suelen compartir campos como "0" o "*"."""
+    return tuple(CronParser._parse_field_uncached(value, min_val, max_val))
+
+
+def _to_mask(values: Tuple[int, ...]) -> int:
+    """Convierte una tupla de valores en un bitmask"""
+    mask = 0
+    for v in values:
+        mask |= 1 << v
+    return mask
+
+
+# Bitmask de "*" para cada campo (minute, hour, day, month, weekday)
+_ALL_MASKS = tuple(_to_mask(_ALL_VALUES[(lo, hi)]) for _, lo, hi in _FIELDS)
+
+
+@lru_cache(maxsize=256)
+def _parse_masks_cached(expression: str) -> Tuple[int, ...]:
+    """Bitmasks por campo de una expresión cron (cacheado)"""
+    return tuple(_to_mask(values) for values in _parse_cached(expression))
+
+
 if __name__ == "__main__":
     # Demo del modelo
     print("=== Demo Cronjob Model ===")
@@ -13,7 +13,19 @@ import threading
 import time
 from datetime import datetime
 from typing import Dict, Optional, Callable
-from tools.cronjobs_model import CronjobManager, CronjobStatus
+from tools.cronjobs_model import CronjobManager, CronjobStatus, PERSIST_RUNNING_STATE
+
+# Último timestamp formateado por hilo: strftime solo corre una vez por segundo
+_ts_cache = threading.local()
+
+
+def _timestamp() -> str:
+    """Hora local como 'YYYY-mm-dd HH:MM:SS', reutilizando el string dentro del mismo segundo"""
+    now = int(time.time())
+    if getattr(_ts_cache, "sec", None) != now:
+        _ts_cache.text = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+        _ts_cache.sec = now
+    return _ts_cache.text
 
 class CronjobScheduler:
     """Scheduler que ejecuta cronjobs segÃºn su programaciÃ³n"""
@@ -38,7 +50,7 @@ class CronjobScheduler:
         
     def _log(self, job_id: str, message: str):
         """Guardar log de ejecuciÃ³n"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = _timestamp()
         log_file = os.path.join(self.log_dir, f"{job_id}.log")
         
         with open(log_file, 'a') as f:
@@ -58,7 +70,8 @@ class CronjobScheduler:
         # Marcar como en ejecuciÃ³n
         cronjob.status = CronjobStatus.RUNNING.value
         cronjob.last_run = datetime.now()
-        self.manager.save()
+        if PERSIST_RUNNING_STATE:
+            self.manager.save_job(job_id)
         
         self._log(job_id, f"Iniciando ejecuciÃ³n: {cronjob.command}")
         
@@ -96,7 +109,7 @@ class CronjobScheduler:
                 
                 cronjob.last_run = datetime.now()
                 cronjob.updated_at = datetime.now()
-                self.manager.save()
+                self.manager.save_job(job_id)  # una sola escritura (WAL) con el estado final
                 
                 # Ejecutar callbacks si existen
                 if job_id in self.execution_callbacks:
@@ -113,7 +126,7 @@ class CronjobScheduler:
             cronjob.error = str(e)
             cronjob.status = CronjobStatus.FAILED.value
             cronjob.updated_at = datetime.now()
-            self.manager.save()
+            self.manager.save_job(job_id)
             self._log(job_id, f"Error fatal: {e}")
     
     def _parse_cron_expression(self, expression: str) -> schedule.Job:
@@ -222,7 +235,7 @@ class CronjobScheduler:
             "enabled_cronjobs": len(self.manager.list_enabled()),
             "running_jobs": len(self.running_jobs),
             "scheduled_jobs": len(getattr(self, '_scheduled_jobs', {})),
-            "next_check": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            "next_check": _timestamp()
         }
 
 
@@ -298,17 +298,17 @@ def _search_emails_sync(query: str, folder: str = "INBOX", limit: int = 10) -> d
 
 async def list_emails(folder: str = "INBOX", limit: int = 10, unread_only: bool = False) -> dict:
     """Listar los últimos N correos."""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, _list_emails_sync, folder, limit, unread_only)
 
 
 async def read_email(email_id: str, folder: str = "INBOX") -> dict:
     """Leer un correo específico por ID."""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, _read_email_sync, email_id, folder)
 
 
 async def search_emails(query: str, folder: str = "INBOX", limit: int = 10) -> dict:
     """Buscar correos por asunto o remitente."""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, _search_emails_sync, query, folder, limit)
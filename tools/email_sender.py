@@ -59,5 +59,5 @@ def _send_email_sync(to: str, subject: str, body: str, html: bool = False) -> di
 
 async def send_email(to: str, subject: str, body: str, html: bool = False) -> dict:
     """Enviar email (wrapper async)."""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, _send_email_sync, to, subject, body, html)
@@ -43,7 +43,7 @@ class NotesDB:
             }
             
             # Operación bloqueante, la subimos a un executor de asyncio
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             result = await loop.run_in_executor(None, self.collection.insert_one, note_doc)
             
             return {
@@ -66,7 +66,7 @@ class NotesDB:
                     rows.append(doc)
                 return rows
 
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             rows = await loop.run_in_executor(None, _fetch_notes)
             
             return {"notes": rows, "count": len(rows)}
@@ -95,7 +95,7 @@ class NotesDB:
                     rows.append(doc)
                 return rows
 
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             rows = await loop.run_in_executor(None, _search)
             
             return {"query": query, "results": rows, "count": len(rows)}
@@ -114,7 +114,7 @@ class NotesDB:
             def _delete():
                 return self.collection.delete_one({"_id": obj_id, "user_id": user_id})
                 
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             result = await loop.run_in_executor(None, _delete)
             
             if result.deleted_count == 0:
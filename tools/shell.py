@@ -28,6 +28,10 @@ CRITICAL_PATTERNS = [
     r'\$\(',     # Command substitution
 ]
 
+# Cada lista compilada en un único regex: una sola pasada sobre el comando
+_CRITICAL_RE = re.compile("|".join(f"({p})" for p in CRITICAL_PATTERNS))
+_BLOCKED_RE = re.compile("|".join(re.escape(b) for b in BLOCKED_COMMANDS))
+
 
 async def run_command(command: str, timeout: int = 30, user: str = "unknown") -> dict:
     """
@@ -53,14 +57,15 @@ async def run_command(command: str, timeout: int = 30, user: str = "unknown") ->
         }
     
     # 2. Verificar patrones críticos (siempre bloqueados)
-    for pattern in CRITICAL_PATTERNS:
-        if re.search(pattern, command):
-            return {
-                "stdout": "",
-                "stderr": f"❌ Patrón crítico bloqueado: '{pattern}'",
-                "returncode": -1,
-                "blocked": True,
-            }
+    match = _CRITICAL_RE.search(command)
+    if match:
+        pattern = CRITICAL_PATTERNS[match.lastindex - 1]
+        return {
+            "stdout": "",
+            "stderr": f"❌ Patrón crítico bloqueado: '{pattern}'",
+            "returncode": -1,
+            "blocked": True,
+        }
     
     # 3. Verificar si es un comando seguro (WHITELIST)
     cmd_lower = command.lower().strip()
@@ -80,8 +85,7 @@ async def run_command(command: str, timeout: int = 30, user: str = "unknown") ->
     # Verificar contra whitelist
     if first_cmd not in SAFE_COMMANDS:
         # Verificar también contra blocked commands (fallback)
-        is_blocked = any(blocked in cmd_lower for blocked in BLOCKED_COMMANDS)
-        if is_blocked:
+        if _BLOCKED_RE.search(cmd_lower):
             return {
                 "stdout": "",
                 "stderr": f"❌ Comando bloqueado por seguridad: '{first_cmd}'",
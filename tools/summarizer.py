@@ -93,5 +93,5 @@ def _fetch_url_text_sync(url: str) -> dict:
 
 async def fetch_and_summarize(url: str) -> dict:
     """Descargar URL y retornar el texto para que el LLM resuma."""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, _fetch_url_text_sync, url)
@@ -123,7 +123,7 @@ async def search(query: str, max_results: int = 5, search_type: str = "text") ->
         logger.warning("Brave falló, intentando DuckDuckGo...")
 
     # Fallback a DuckDuckGo/Google News RSS (en thread para no bloquear el event loop)
-    results = await asyncio.get_event_loop().run_in_executor(
+    results = await asyncio.get_running_loop().run_in_executor(
         None, _ddg_search, query, max_results, search_type
     )
 